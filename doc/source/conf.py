@@ -21,6 +21,7 @@ import os
 import sys
 
 sys.path.insert(0, os.path.abspath("../../logiled"))
+sys.path.insert(0, os.path.abspath("../.."))
 
 project = "LogiLed"
 copyright = "2015-2022, Tom Lambert (Logitech) & 2022-present, Gamingdy"
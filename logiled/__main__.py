@@ -0,0 +1,94 @@
+"""
+.. note::
+    __main__.py : Command line interface, run with ``python -m logiled``.
+"""
+
+import argparse
+
+from .logi_led import NotTested, RangeError, load_dll
+
+
+def _render(parser, arguments):
+    from .render import check_render, render
+
+    options = dict(
+        fps=arguments.fps,
+        seed=arguments.seed,
+        workers=arguments.workers,
+        chunk_frames=arguments.chunk_frames,
+    )
+    try:
+        check_render(arguments.effect, arguments.duration, **options)
+    except (ImportError, RangeError, TypeError) as error:
+        parser.error(str(error))
+    count = render(
+        arguments.effect, arguments.output, arguments.duration, **options
+    )
+    print(f"Rendered {count} frames to {arguments.output}")
+
+
+def _play(parser, arguments):
+    from .render import Playback
+
+    playback = Playback(arguments.file)
+    load_dll()
+    logi_led = NotTested()
+    try:
+        playback.play(logi_led, loop=arguments.loop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logi_led.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m logiled",
+        description="A simple python wrapper for Logitech G's LED",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = commands.add_parser(
+        "render", help="pre-render an effect into a playback file"
+    )
+    render_parser.add_argument(
+        "effect", help="effect to render, as module:function"
+    )
+    render_parser.add_argument("output", help="playback file to write")
+    render_parser.add_argument(
+        "--duration",
+        type=float,
+        required=True,
+        help="duration of the animation, in seconds",
+    )
+    render_parser.add_argument(
+        "--fps", type=int, default=30, help="frames per second (default: 30)"
+    )
+    render_parser.add_argument(
+        "--seed", type=int, default=0, help="random seed (default: 0)"
+    )
+    render_parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of processes (default: number of processors)",
+    )
+    render_parser.add_argument(
+        "--chunk-frames", type=int, help="number of frames per chunk"
+    )
+    render_parser.set_defaults(function=_render)
+
+    play_parser = commands.add_parser(
+        "play", help="stream a playback file to the keyboard"
+    )
+    play_parser.add_argument("file", help="playback file to play")
+    play_parser.add_argument(
+        "--loop", action="store_true", help="play the animation in a loop"
+    )
+    play_parser.set_defaults(function=_play)
+
+    arguments = parser.parse_args(argv)
+    arguments.function(parser, arguments)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+.. note::
+    adaptive.py : Frame rate controller following the measured latency of the SDK.
+
+    How fast a device accepts updates depends on the machine and on the load of Logitech G Hub. The controller
+    times the lighting calls made during each frame and picks the highest rate, between a minimum and a maximum,
+    that leaves enough time between frames for the SDK to keep up.
+"""
+
+import time
+
+from .logi_led import RangeError, check_value
+
+#: The maximum rate is used, the SDK is fast enough.
+REASON_MAXIMUM = "maximum"
+#: The rate is limited by the measured latency of the SDK.
+REASON_LATENCY = "latency"
+#: The latency of the SDK is too high even for the minimum rate.
+REASON_MINIMUM = "minimum"
+#: The rate is rising back towards the one allowed by the latency.
+REASON_RECOVERING = "recovering"
+#: No call was measured yet.
+REASON_NO_DATA = "no data"
+
+
+class _TimedDLL:
+    """
+    Proxy of a DLL timing the calls to the lighting functions.
+    """
+
+    def __init__(self, dll, controller):
+        self._dll = dll
+        self._controller = controller
+        self._wrappers = {}
+
+    def __getattr__(self, name):
+        function = getattr(self._dll, name)
+        if not name.startswith(AdaptiveFrameRate.MEASURED_PREFIX):
+            return function
+        wrapper = self._wrappers.get(name)
+        if wrapper is None:
+            controller = self._controller
+            clock = controller.clock
+
+            def wrapper(*args):
+                start = clock()
+                try:
+                    return function(*args)
+                finally:
+                    controller.record(name, clock() - start)
+
+            self._wrappers[name] = wrapper
+        return wrapper
+
+
+class AdaptiveFrameRate:
+    """
+    Chooses the render rate from the time the SDK takes to apply each frame.
+
+    The time spent in the lighting calls of each frame is tracked with an exponentially weighted mean and
+    variance. The rate is the one for which a pessimistic estimate of that time, the mean plus ``deviations``
+    standard deviations, fills ``load`` of each frame interval. The rate drops at once when the SDK slows down, so
+    no lag builds up, and rises back by ``recovery`` at most each frame.
+
+    .. code-block:: python
+
+        controller = AdaptiveFrameRate(min_fps=10, max_fps=60)
+        led = controller.instrument(NotTested())
+        while running:
+            led.set_lighting_from_bitmap(render())
+            controller.wait()
+
+    :param float min_fps: Lowest rate, in frames per second.
+    :param float max_fps: Highest rate, in frames per second.
+    :param float load: Fraction of each frame interval the SDK calls may use. **Range is 0 to 1**.
+    :param float smoothing: Weight of each new measure in the estimator. **Range is 0 to 1**.
+    :param float deviations: Number of standard deviations added to the mean latency.
+    :param float recovery: Factor by which the rate may rise each frame, greater than 1.
+    :param clock: Function returning the current time in seconds.
+    :param sleep: Function waiting for a number of seconds.
+
+    :ivar float rate: Current render rate, in frames per second.
+    :ivar str reason: Why :attr:`rate` was chosen, one of the ``REASON_*`` constants of this module.
+    :ivar float frame_latency: Estimated time, in seconds, spent in the SDK per frame.
+    :ivar dict latencies: Mean latency, in seconds, of each measured SDK function.
+
+    :raises RangeError: Raised if a parameter range is not correct
+    """
+
+    MEASURED_PREFIX = "LogiLedSetLighting"
+
+    def __init__(
+        self,
+        min_fps: float = 10,
+        max_fps: float = 60,
+        load: float = 0.5,
+        smoothing: float = 0.1,
+        deviations: float = 2,
+        recovery: float = 1.05,
+        clock=time.perf_counter,
+        sleep=time.sleep,
+    ):
+        check_value(0, float("inf"), deviations)
+        check_value(min_fps, float("inf"), max_fps)
+        check_value(0, 1, load, smoothing)
+        if min_fps <= 0 or load <= 0 or smoothing <= 0:
+            raise RangeError(
+                "min_fps, load and smoothing must be greater than 0"
+            )
+        if not recovery > 1:
+            raise RangeError("recovery must be greater than 1")
+
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.load = load
+        self.smoothing = smoothing
+        self.deviations = deviations
+        self.recovery = recovery
+        self.clock = clock
+        self.sleep = sleep
+
+        self.rate = max_fps
+        self.reason = REASON_NO_DATA
+        self.frame_latency = 0.0
+        self.latencies = {}
+        self._mean = None
+        self._variance = 0.0
+        self._frame_cost = 0.0
+        self._frame_calls = 0
+        self._deadline = None
+
+    def instrument(self, led):
+        """
+        Makes the controller time the lighting calls of a :class:`~logiled.logi_led.LogitechLed` instance.
+
+        :param led: Instance to instrument. Its DLL is replaced by a timing proxy.
+
+        :return: The same instance
+        """
+        if not isinstance(led.led_dll, _TimedDLL):
+            led.led_dll = _TimedDLL(led.led_dll, self)
+        return led
+
+    def record(self, name: str, seconds: float):
+        """
+        Adds the duration of a SDK call to the current frame. Called by the instrumented DLL, or directly for calls
+        made elsewhere.
+
+        :param str name: Name of the SDK function.
+        :param float seconds: Duration of the call.
+        """
+        self._frame_cost += seconds
+        self._frame_calls += 1
+        mean = self.latencies.get(name)
+        self.latencies[name] = (
+            seconds
+            if mean is None
+            else mean + self.smoothing * (seconds - mean)
+        )
+
+    def end_frame(self):
+        """
+        Updates the estimator with the calls made since the previous frame and chooses the next rate.
+
+        :return: The new rate, in frames per second
+        :rtype: float
+        """
+        if self._frame_calls:
+            cost = self._frame_cost
+            if self._mean is None:
+                self._mean = cost
+            else:
+                delta = cost - self._mean
+                self._mean += self.smoothing * delta
+                self._variance = (1 - self.smoothing) * (
+                    self._variance + self.smoothing * delta * delta
+                )
+            self.frame_latency = (
+                self._mean + self.deviations * self._variance**0.5
+            )
+        self._frame_cost = 0.0
+        self._frame_calls = 0
+
+        if self._mean is None:
+            return self.rate
+        if self.frame_latency > 0:
+            target = self.load / self.frame_latency
+        else:
+            target = float("inf")
+
+        if target >= self.max_fps:
+            target, reason = self.max_fps, REASON_MAXIMUM
+        elif target <= self.min_fps:
+            target, reason = self.min_fps, REASON_MINIMUM
+        else:
+            reason = REASON_LATENCY
+
+        if target > self.rate * self.recovery:
+            self.rate *= self.recovery
+            self.reason = REASON_RECOVERING
+        else:
+            self.rate = target
+            self.reason = reason
+        return self.rate
+
+    def wait(self):
+        """
+        Ends the current frame, see :func:`end_frame`, then waits until the next frame is due.
+
+        If a frame ran late, the schedule restarts from now instead of sending the next frames in a burst.
+        """
+        self.end_frame()
+        now = self.clock()
+        interval = 1 / self.rate
+        if self._deadline is None or now - self._deadline > interval:
+            self._deadline = now
+        self._deadline += interval
+        self.sleep(self._deadline - now)
@@ -0,0 +1,235 @@
+"""
+.. note::
+    ambient.py : Ambient lighting following the colors of images or video frames.
+
+    Each frame is averaged down to one color per key of the bitmap, or to one color per zone for zonal devices,
+    and smoothed over time before being sent.
+
+.. warning::
+    This module requires `numpy <https://pypi.org/project/numpy/>`_. Reading image files also requires
+    `Pillow <https://pypi.org/project/Pillow/>`_. You can install both by ``pip install logiled[pillow]``.
+"""
+
+import numpy as np
+
+from .bitmap import column_zones, frame_to_bitmap, new_bitmap
+from .dll_definition import LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH
+from .logi_led import RangeError, check_type, check_value
+
+
+def as_pixels(frame, size: tuple = None):
+    """
+    Returns a frame as a ``(height, width, channels)`` array of bytes, without copying it when possible.
+
+    :param frame: A NumPy array of ``uint8``, a PIL image or any object supporting the buffer protocol (bytes,
+                  bytearray, memoryview, mmap...) holding packed RGB or RGBA pixels, one byte per channel.
+    :param tuple size: ``(width, height)`` of the frame. Only needed for raw buffers.
+
+    :return: The pixels of the frame
+    :rtype: numpy.ndarray
+
+    :raises RangeError: Raised if the frame size is not correct
+    :raises TypeError: Raised if bad type is passed as parameter or if an array is not of ``uint8``
+    """
+    if hasattr(frame, "getbands"):
+        if frame.mode not in ("RGB", "RGBA"):
+            frame = frame.convert("RGB")
+        frame = np.asarray(frame)
+    elif not isinstance(frame, np.ndarray):
+        if size is None:
+            raise TypeError("size must be given for raw buffers")
+        width, height = size
+        view = memoryview(frame)
+        channels, remainder = divmod(view.nbytes, width * height)
+        if remainder or channels not in (3, 4):
+            raise RangeError(
+                f"A buffer of {view.nbytes} bytes is not a {width}x{height} RGB or RGBA frame"
+            )
+        frame = np.frombuffer(view, dtype=np.uint8).reshape(
+            height, width, channels
+        )
+
+    if frame.dtype != np.uint8:
+        raise TypeError(f"Frame must be an array of uint8, not {frame.dtype}")
+    if frame.ndim != 3 or frame.shape[2] not in (3, 4):
+        raise RangeError("Frame must have 3 (RGB) or 4 (RGBA) channels")
+    if (
+        frame.shape[0] < LOGI_LED_BITMAP_HEIGHT
+        or frame.shape[1] < LOGI_LED_BITMAP_WIDTH
+    ):
+        raise RangeError(
+            f"Frame can't be smaller than {LOGI_LED_BITMAP_WIDTH}x{LOGI_LED_BITMAP_HEIGHT}"
+        )
+    return frame
+
+
+class AreaAverager:
+    """
+    Averages frames down to the key grid, each key taking the mean color of the area of the frame it covers.
+
+    The bands of rows are summed first, then the columns, so a frame is read only once. The edges of the areas are
+    computed once per frame shape.
+    """
+
+    def __init__(self):
+        self._shape = None
+        self.grid = np.zeros(
+            (LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH, 3),
+            dtype=np.float32,
+        )
+
+    def _prepare(self, shape):
+        height, width, channels = shape
+        self._shape = shape
+        self._row_edges = np.linspace(
+            0, height, LOGI_LED_BITMAP_HEIGHT + 1
+        ).astype(np.intp)
+        column_edges = np.linspace(0, width, LOGI_LED_BITMAP_WIDTH + 1).astype(
+            np.intp
+        )
+        self._column_starts = column_edges[:-1]
+        self._rows = np.empty(
+            (LOGI_LED_BITMAP_HEIGHT, width, channels), dtype=np.uint32
+        )
+        self._sums = np.empty(
+            (LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH, channels),
+            dtype=np.uint32,
+        )
+        areas = np.outer(np.diff(self._row_edges), np.diff(column_edges))
+        self._inverse_areas = (1 / areas).astype(np.float32)[..., None]
+
+    def average(self, pixels):
+        """
+        :param numpy.ndarray pixels: A ``(height, width, channels)`` array of bytes, see :func:`as_pixels`.
+
+        :return: :attr:`grid`, the mean RGB color of each key, from 0 to 255
+        :rtype: numpy.ndarray
+        """
+        if pixels.shape != self._shape:
+            self._prepare(pixels.shape)
+        edges = self._row_edges
+        for row in range(LOGI_LED_BITMAP_HEIGHT):
+            np.sum(
+                pixels[edges[row] : edges[row + 1]],
+                axis=0,
+                dtype=np.uint32,
+                out=self._rows[row],
+            )
+        np.add.reduceat(
+            self._rows, self._column_starts, axis=1, out=self._sums
+        )
+        np.multiply(self._sums[..., :3], self._inverse_areas, out=self.grid)
+        return self.grid
+
+
+class AmbientLight:
+    """
+    Sends the colors of a stream of frames to the keyboard, or to the zones of zonal devices.
+
+    .. code-block:: python
+
+        ambient = AmbientLight(NotTested())
+        for frame in frames:
+            ambient.update(frame)
+
+    :param led: A :class:`~logiled.logi_led.NotTested` instance used to send the colors.
+    :param float smoothing: Weight of the previous colors in each new color. **Range is 0 to 1**.
+    :param int zones: If given, the keyboard is split in this number of vertical zones and the colors are sent with
+                      :func:`set_lighting_for_target_zone <logiled.logi_led.LogitechLed.set_lighting_for_target_zone>`
+                      instead of a bitmap.
+    :param int first_zone: Id of the leftmost zone.
+
+    :raises RangeError: Raised if a parameter range is not correct
+    :raises TypeError: Raised if bad type is passed as parameter
+    """
+
+    def __init__(
+        self,
+        led,
+        smoothing: float = 0.5,
+        zones: int = None,
+        first_zone: int = 1,
+    ):
+        check_value(0, 1, smoothing)
+        check_type(int, first_zone)
+
+        self.led = led
+        self.smoothing = smoothing
+        self.first_zone = first_zone
+        self._averager = AreaAverager()
+        self._started = False
+        self.colors = np.zeros(
+            (LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH, 3),
+            dtype=np.float32,
+        )
+        self.bitmap = new_bitmap()
+
+        self.zone_colors = None
+        if zones is not None:
+            masks = column_zones(zones).reshape(zones, -1).astype(np.float32)
+            self._zone_weights = masks / masks.sum(axis=1, keepdims=True)
+            self.zone_colors = np.zeros((zones, 3), dtype=np.float32)
+            self._zone_percentages = np.empty((zones, 3), dtype=np.intp)
+
+    def downsample(self, frame, size: tuple = None):
+        """
+        Averages a frame down to the key grid and blends it into :attr:`colors`.
+
+        :param frame: Frame to downsample, see :func:`as_pixels`.
+        :param tuple size: ``(width, height)`` of the frame. Only needed for raw buffers.
+
+        :return: :attr:`colors`, the smoothed RGB color of each key, from 0 to 255
+        :rtype: numpy.ndarray
+        """
+        grid = self._averager.average(as_pixels(frame, size))
+        if self._started:
+            self.colors *= self.smoothing
+            self.colors += (1 - self.smoothing) * grid
+        else:
+            self.colors[...] = grid
+            self._started = True
+        return self.colors
+
+    def update(self, frame, size: tuple = None):
+        """
+        Downsamples a frame and sends the result.
+
+        :param frame: Frame to send, see :func:`as_pixels`.
+        :param tuple size: ``(width, height)`` of the frame. Only needed for raw buffers.
+
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        self.downsample(frame, size)
+        if self.zone_colors is None:
+            frame_to_bitmap(self.colors, out=self.bitmap)
+            self.led.set_lighting_from_bitmap(self.bitmap)
+            return
+
+        np.dot(
+            self._zone_weights,
+            self.colors.reshape(-1, 3),
+            out=self.zone_colors,
+        )
+        np.multiply(
+            self.zone_colors,
+            100 / 255,
+            out=self._zone_percentages,
+            casting="unsafe",
+        )
+        for zone, (red, green, blue) in enumerate(
+            self._zone_percentages.tolist(), self.first_zone
+        ):
+            self.led.set_lighting_for_target_zone(zone, red, green, blue)
+
+    def update_from_file(self, path):
+        """
+        Reads an image file and sends it, see :func:`update`.
+
+        :param path: Path to the image.
+
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        from PIL import Image
+
+        with Image.open(path) as image:
+            self.update(image)
@@ -0,0 +1,395 @@
+"""
+.. note::
+    audio.py : Streaming audio visualizer drawing a spectrum on the keyboard.
+
+    PCM samples are read in chunks from a WAV file, a raw stream (e.g. ``sys.stdin.buffer``) or any iterator of
+    NumPy arrays. Every buffer is allocated once, so memory stays constant whatever the length of the stream.
+
+.. warning::
+    This module requires `numpy <https://pypi.org/project/numpy/>`_. You can install it by
+    ``pip install logiled[numpy]``.
+"""
+
+import time
+import wave
+
+import numpy as np
+
+from .bitmap import frame_to_bitmap, new_bitmap
+from .dll_definition import LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH
+from .logi_led import RangeError, check_type, check_value
+
+_SAMPLE_TYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def _decode(raw, sample_width, channels, out):
+    """
+    Decodes interleaved PCM bytes into mono float samples in the -1 to 1 range, written into ``out``.
+    """
+    samples = np.frombuffer(raw, dtype=_SAMPLE_TYPES[sample_width])
+    frames = samples.size // channels
+    samples = samples[: frames * channels].reshape(frames, channels)
+    chunk = out[:frames]
+    np.mean(samples, axis=1, out=chunk)
+    if sample_width == 1:
+        chunk -= 128
+    chunk *= 1 / (1 << (8 * sample_width - 1))
+    return chunk
+
+
+def _check_sample_width(sample_width):
+    if sample_width not in _SAMPLE_TYPES:
+        raise RangeError(
+            f"Sample width must be one of {sorted(_SAMPLE_TYPES)} bytes"
+        )
+
+
+class WavSource:
+    """
+    Iterates over a PCM WAV file, one chunk of mono samples at a time.
+
+    .. warning::
+        The same array is yielded for every chunk, copy it if you need to keep it.
+
+    :param path: Path to the WAV file.
+    :param int chunk_size: Number of samples per chunk.
+
+    :ivar int sample_rate: Sample rate of the file, in Hz.
+    """
+
+    def __init__(self, path, chunk_size: int = 1024):
+        check_type(int, chunk_size)
+        check_value(1, float("inf"), chunk_size)
+        self.path = path
+        self.chunk_size = chunk_size
+        with wave.open(str(path), "rb") as wav:
+            self.sample_rate = wav.getframerate()
+            _check_sample_width(wav.getsampwidth())
+
+    def __iter__(self):
+        out = np.empty(self.chunk_size, dtype=np.float32)
+        with wave.open(str(self.path), "rb") as wav:
+            sample_width = wav.getsampwidth()
+            channels = wav.getnchannels()
+            while True:
+                raw = wav.readframes(self.chunk_size)
+                if not raw:
+                    return
+                yield _decode(raw, sample_width, channels, out)
+
+
+class PcmStream:
+    """
+    Iterates over raw interleaved PCM read from a binary stream, one chunk of mono samples at a time.
+
+    .. code-block:: python
+
+        source = PcmStream(sys.stdin.buffer, 44100, channels=2)
+
+    .. warning::
+        The same array is yielded for every chunk, copy it if you need to keep it.
+
+    :param stream: Binary stream supporting ``readinto``.
+    :param int sample_rate: Sample rate of the stream, in Hz.
+    :param int channels: Number of interleaved channels.
+    :param int sample_width: Size of a sample in bytes, 1 (unsigned), 2 or 4 (signed).
+    :param int chunk_size: Number of samples per chunk.
+    """
+
+    def __init__(
+        self,
+        stream,
+        sample_rate: int,
+        channels: int = 1,
+        sample_width: int = 2,
+        chunk_size: int = 1024,
+    ):
+        check_type(int, sample_rate, channels, sample_width, chunk_size)
+        check_value(1, float("inf"), sample_rate, channels, chunk_size)
+        _check_sample_width(sample_width)
+        self.stream = stream
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        frame_size = self.channels * self.sample_width
+        raw = bytearray(self.chunk_size * frame_size)
+        view = memoryview(raw)
+        out = np.empty(self.chunk_size, dtype=np.float32)
+        filled = 0
+        while True:
+            read = self.stream.readinto(view[filled:])
+            if not read:
+                break
+            filled += read
+            if filled == len(raw):
+                yield _decode(view, self.sample_width, self.channels, out)
+                filled = 0
+        if filled >= frame_size:
+            yield _decode(
+                view[: filled - filled % frame_size],
+                self.sample_width,
+                self.channels,
+                out,
+            )
+
+
+class AudioVisualizer:
+    """
+    Draws the spectrum of an audio stream as bars, one per bitmap column, with a peak marker above each bar.
+
+    Each frame runs a Hann windowed FFT over the last ``fft_size`` samples, averages the magnitude in logarithmic
+    frequency bands and smooths the result over time.
+
+    .. code-block:: python
+
+        source = WavSource("music.wav")
+        visualizer = AudioVisualizer(NotTested(), source.sample_rate)
+        visualizer.run(source)
+
+    :param led: A :class:`~logiled.logi_led.NotTested` instance used to send the bitmap.
+    :param int sample_rate: Sample rate of the audio, in Hz.
+    :param int fps: Number of frames sent per second of audio.
+    :param int fft_size: Number of samples analysed per frame.
+    :param float smoothing: Weight of the previous level in each new level. **Range is 0 to 1**.
+    :param float floor_db: Level, in decibel below full scale, displayed as an empty bar.
+    :param int peak_hold: Number of frames a peak is held before falling.
+    :param float peak_fall: Height, as a fraction of the keyboard, a peak falls each frame.
+    :param tuple low_color: Color of the bottom row, as RGB percentages.
+    :param tuple high_color: Color of the top row, as RGB percentages.
+    :param tuple peak_color: Color of the peak markers, as RGB percentages.
+    :param float min_frequency: Lower edge of the first band, in Hz.
+    :param float max_frequency: Upper edge of the last band, in Hz. Limited to the Nyquist frequency.
+
+    :raises RangeError: Raised if a parameter range is not correct
+    :raises TypeError: Raised if bad type is passed as parameter
+    """
+
+    def __init__(
+        self,
+        led,
+        sample_rate: int,
+        fps: int = 30,
+        fft_size: int = 2048,
+        smoothing: float = 0.6,
+        floor_db: float = 60.0,
+        peak_hold: int = 15,
+        peak_fall: float = 0.02,
+        low_color: tuple = (0, 100, 0),
+        high_color: tuple = (100, 0, 0),
+        peak_color: tuple = (100, 100, 100),
+        min_frequency: float = 40.0,
+        max_frequency: float = 16000.0,
+    ):
+        check_type(int, sample_rate, fps, fft_size, peak_hold)
+        check_value(1, float("inf"), sample_rate, fps)
+        check_value(LOGI_LED_BITMAP_WIDTH * 2, float("inf"), fft_size)
+        check_value(0, 1, smoothing, peak_fall)
+        check_value(0, 100, *low_color, *high_color, *peak_color)
+        if not floor_db > 0:
+            raise RangeError("floor_db must be greater than 0")
+        max_frequency = min(max_frequency, sample_rate / 2)
+        if not 0 < min_frequency < max_frequency:
+            raise RangeError(
+                "min_frequency must be greater than 0 and lower than "
+                "max_frequency and the Nyquist frequency"
+            )
+
+        self.led = led
+        self.sample_rate = sample_rate
+        self.fps = fps
+        self.smoothing = smoothing
+        self.floor_db = floor_db
+        self.peak_hold = peak_hold
+        self.peak_fall = peak_fall
+        self.peak_color = np.asarray(peak_color, dtype=np.float32) * 2.55
+
+        self._hop = max(1, round(sample_rate / fps))
+        self._pending = 0
+        self._ring = np.zeros(fft_size, dtype=np.float32)
+        self._write = 0
+        self._window = np.hanning(fft_size).astype(np.float32)
+        self._windowed = np.empty(fft_size, dtype=np.float32)
+        # A full scale sine gives a magnitude of 1 once scaled by half of the window sum.
+        self._magnitude = np.empty(fft_size // 2 + 1, dtype=np.float32)
+        self._scale = np.float32(2 / self._window.sum())
+
+        edges = np.geomspace(
+            min_frequency, max_frequency, LOGI_LED_BITMAP_WIDTH + 1
+        )
+        bins = np.round(edges * fft_size / sample_rate).astype(np.intp)
+        for i in range(1, len(bins)):
+            bins[i] = max(bins[i], bins[i - 1] + 1)
+        if bins[-1] > fft_size // 2 + 1:
+            raise RangeError(
+                "fft_size is too small for the requested frequencies"
+            )
+        self._band_starts = bins[:-1]
+        self._band_end = bins[-1]
+        self._band_widths = np.diff(bins).astype(np.float32)
+
+        self._bands = np.empty(LOGI_LED_BITMAP_WIDTH, dtype=np.float32)
+        self.levels = np.zeros(LOGI_LED_BITMAP_WIDTH, dtype=np.float32)
+        self.peaks = np.zeros(LOGI_LED_BITMAP_WIDTH, dtype=np.float32)
+        self._hold = np.zeros(LOGI_LED_BITMAP_WIDTH, dtype=np.intp)
+        self._mask = np.empty(LOGI_LED_BITMAP_WIDTH, dtype=bool)
+        self._peak_rows = np.empty(LOGI_LED_BITMAP_WIDTH, dtype=np.intp)
+        self._columns = np.arange(LOGI_LED_BITMAP_WIDTH)
+
+        # Height of the bottom of each row, the top row first.
+        self._row_levels = np.arange(
+            LOGI_LED_BITMAP_HEIGHT - 1, -1, -1, dtype=np.float32
+        )[:, None]
+        self._intensity = np.empty(
+            (LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH), dtype=np.float32
+        )
+        mix = (self._row_levels / (LOGI_LED_BITMAP_HEIGHT - 1))[..., None]
+        self._palette = (
+            np.asarray(low_color, dtype=np.float32) * (1 - mix)
+            + np.asarray(high_color, dtype=np.float32) * mix
+        ) * 2.55
+        self._frame = np.empty(
+            (LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH, 3),
+            dtype=np.float32,
+        )
+        self.bitmap = new_bitmap()
+
+    def _push(self, samples):
+        size = self._ring.size
+        if samples.size >= size:
+            self._ring[:] = samples[-size:]
+            self._write = 0
+            return
+        end = self._write + samples.size
+        if end <= size:
+            self._ring[self._write : end] = samples
+        else:
+            split = size - self._write
+            self._ring[self._write :] = samples[:split]
+            self._ring[: end - size] = samples[split:]
+        self._write = end % size
+
+    def _analyse(self):
+        size = self._ring.size
+        oldest = size - self._write
+        np.multiply(
+            self._ring[self._write :],
+            self._window[:oldest],
+            out=self._windowed[:oldest],
+        )
+        np.multiply(
+            self._ring[: self._write],
+            self._window[oldest:],
+            out=self._windowed[oldest:],
+        )
+        np.abs(np.fft.rfft(self._windowed), out=self._magnitude)
+
+        bands = self._bands
+        np.add.reduceat(
+            self._magnitude[: self._band_end], self._band_starts, out=bands
+        )
+        bands /= self._band_widths
+        bands *= self._scale
+        np.maximum(bands, 1e-9, out=bands)
+        np.log10(bands, out=bands)
+        bands *= 20 / self.floor_db
+        bands += 1
+        np.clip(bands, 0, 1, out=bands)
+
+        levels = self.levels
+        levels *= self.smoothing
+        levels += (1 - self.smoothing) * bands
+
+        peaks = self.peaks
+        np.greater_equal(levels, peaks, out=self._mask)
+        self._hold -= 1
+        np.copyto(self._hold, self.peak_hold, where=self._mask)
+        np.copyto(peaks, levels, where=self._mask)
+        np.less(self._hold, 0, out=self._mask)
+        np.subtract(peaks, self.peak_fall, out=peaks, where=self._mask)
+        np.maximum(peaks, levels, out=peaks)
+
+    def _draw(self):
+        intensity = self._intensity
+        np.multiply(self.levels, LOGI_LED_BITMAP_HEIGHT, out=intensity[0])
+        intensity[1:] = intensity[0]
+        intensity -= self._row_levels
+        np.clip(intensity, 0, 1, out=intensity)
+        np.multiply(intensity[..., None], self._palette, out=self._frame)
+
+        # A peak is drawn on the row it reaches, once it covers at least a tenth of it.
+        rows = self._peak_rows
+        heights = self._intensity[0]
+        np.multiply(self.peaks, LOGI_LED_BITMAP_HEIGHT, out=heights)
+        heights -= 0.1
+        np.ceil(heights, out=heights)
+        np.subtract(
+            LOGI_LED_BITMAP_HEIGHT, heights, out=rows, casting="unsafe"
+        )
+        np.less(rows, LOGI_LED_BITMAP_HEIGHT, out=self._mask)
+        self._frame[rows[self._mask], self._columns[self._mask]] = (
+            self.peak_color
+        )
+
+        frame_to_bitmap(self._frame, out=self.bitmap)
+
+    def frames(self, source):
+        """
+        Renders a frame every ``sample_rate / fps`` samples of the source.
+
+        :param source: Iterable of chunks of mono float samples in the -1 to 1 range, such as a
+                       :class:`WavSource` or a :class:`PcmStream`.
+
+        :return: A generator yielding :attr:`bitmap` after each frame
+        """
+        for chunk in source:
+            chunk = np.asarray(chunk, dtype=np.float32)
+            position = 0
+            while position < chunk.size:
+                take = min(self._hop - self._pending, chunk.size - position)
+                self._push(chunk[position : position + take])
+                position += take
+                self._pending += take
+                if self._pending == self._hop:
+                    self._pending = 0
+                    self._analyse()
+                    self._draw()
+                    yield self.bitmap
+
+    def flush(self):
+        """
+        Sends the last rendered frame to the keyboard.
+
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        self.led.set_lighting_from_bitmap(self.bitmap)
+
+    def run(self, source, realtime: bool = True):
+        """
+        Renders and sends every frame of the source.
+
+        :param source: See :func:`frames`.
+        :param bool realtime: If True, frames are sent at ``fps`` frames per second. If False, they are sent as fast
+                              as they are rendered, which is useful to process a file offline.
+
+        :return: Number of frames sent
+        :rtype: int
+
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        interval = 1 / self.fps
+        deadline = time.perf_counter()
+        count = 0
+        for _ in self.frames(source):
+            if realtime:
+                deadline += interval
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    deadline = time.perf_counter()
+            self.flush()
+            count += 1
+        return count
@@ -0,0 +1,86 @@
+"""
+.. note::
+    bitmap.py : NumPy helpers to build the bitmap passed to
+    :func:`set_lighting_from_bitmap <logiled.logi_led.NotTested.set_lighting_from_bitmap>`.
+
+    A *frame* is a ``(LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH, 3)`` array of RGB values from 0 to 255,
+    one pixel per key. The SDK bitmap stores the same pixels as BGRA bytes.
+
+.. warning::
+    This module requires `numpy <https://pypi.org/project/numpy/>`_. You can install it by
+    ``pip install logiled[numpy]``.
+"""
+
+import numpy as np
+
+from .dll_definition import (
+    LOGI_LED_BITMAP_BYTES_PER_KEY,
+    LOGI_LED_BITMAP_HEIGHT,
+    LOGI_LED_BITMAP_SIZE,
+    LOGI_LED_BITMAP_WIDTH,
+)
+from .logi_led import check_type, check_value
+
+FRAME_SHAPE = (LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH, 3)
+
+
+def new_frame():
+    """
+    :return: A black frame.
+    :rtype: numpy.ndarray
+    """
+    return np.zeros(FRAME_SHAPE, dtype=np.uint8)
+
+
+def new_bitmap():
+    """
+    :return: A black, fully opaque bitmap of ``LOGI_LED_BITMAP_SIZE`` bytes.
+    :rtype: numpy.ndarray
+    """
+    bitmap = np.zeros(LOGI_LED_BITMAP_SIZE, dtype=np.uint8)
+    bitmap[
+        LOGI_LED_BITMAP_BYTES_PER_KEY - 1 :: LOGI_LED_BITMAP_BYTES_PER_KEY
+    ] = 255
+    return bitmap
+
+
+def frame_to_bitmap(frame, out=None):
+    """
+    Converts a RGB frame into a SDK bitmap.
+
+    :param numpy.ndarray frame: Frame to convert. Float frames must already be in the 0 to 255 range.
+    :param numpy.ndarray out: Bitmap to write into, as returned by :func:`new_bitmap`. A new one is allocated if
+                              not given.
+
+    :return: The bitmap
+    :rtype: numpy.ndarray
+    """
+    if out is None:
+        out = new_bitmap()
+    pixels = out.reshape(
+        LOGI_LED_BITMAP_HEIGHT,
+        LOGI_LED_BITMAP_WIDTH,
+        LOGI_LED_BITMAP_BYTES_PER_KEY,
+    )
+    np.copyto(pixels[..., 2::-1], frame, casting="unsafe")
+    return out
+
+
+def column_zones(count: int):
+    """
+    Splits the bitmap into vertical strips of columns of about the same width, from left to right.
+
+    :param int count: Number of zones.
+
+    :return: A ``(count, LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH)`` boolean array, one mask per zone
+    :rtype: numpy.ndarray
+
+    :raises RangeError: Raised if count range is not correct
+    :raises TypeError: Raised if bad type is passed as parameter
+    """
+    check_type(int, count)
+    check_value(1, LOGI_LED_BITMAP_WIDTH, count)
+    edges = np.linspace(0, LOGI_LED_BITMAP_WIDTH, count + 1).round()
+    columns = np.arange(LOGI_LED_BITMAP_WIDTH)
+    strips = (columns >= edges[:-1, None]) & (columns < edges[1:, None])
+    return np.repeat(strips[:, None, :], LOGI_LED_BITMAP_HEIGHT, axis=1)
@@ -127,6 +127,35 @@ LOGI_LED_BITMAP_SIZE = (
     LOGI_LED_BITMAP_WIDTH * LOGI_LED_BITMAP_HEIGHT * LOGI_LED_BITMAP_BYTES_PER_KEY
 )
 
+# Position of the keys on the bitmap, one tuple per row, None where no key is lit. Follows the layout of a
+# full-size keyboard, keys absent from it (G keys, logo...) are not on the bitmap.
+LOGI_LED_BITMAP_LAYOUT = (
+    (ESC, F1, F2, F3, F4, F5, F6, F7, F8, F9, F10, F11, F12, PRINT_SCREEN,
+     SCROLL_LOCK, PAUSE_BREAK, None, None, None, None, None),
+    (TILDE, ONE, TWO, THREE, FOUR, FIVE, SIX, SEVEN, EIGHT, NINE, ZERO, MINUS,
+     EQUALS, BACKSPACE, INSERT, HOME, PAGE_UP, NUM_LOCK, NUM_SLASH,
+     NUM_ASTERISK, NUM_MINUS),
+    (TAB, Q, W, E, R, T, Y, U, I, O, P, OPEN_BRACKET, CLOSE_BRACKET,
+     BACKSLASH, KEYBOARD_DELETE, END, PAGE_DOWN, NUM_SEVEN, NUM_EIGHT,
+     NUM_NINE, NUM_PLUS),
+    (CAPS_LOCK, A, S, D, F, G, H, J, K, L, SEMICOLON, APOSTROPHE, None, ENTER,
+     None, None, None, NUM_FOUR, NUM_FIVE, NUM_SIX, None),
+    (LEFT_SHIFT, None, Z, X, C, V, B, N, M, COMMA, PERIOD, FORWARD_SLASH,
+     None, RIGHT_SHIFT, None, ARROW_UP, None, NUM_ONE, NUM_TWO, NUM_THREE,
+     NUM_ENTER),
+    (LEFT_CONTROL, LEFT_WINDOWS, LEFT_ALT, None, None, SPACE, None, None, None,
+     None, RIGHT_ALT, RIGHT_WINDOWS, APPLICATION_SELECT, RIGHT_CONTROL,
+     ARROW_LEFT, ARROW_DOWN, ARROW_RIGHT, NUM_ZERO, None, NUM_PERIOD, None),
+)  # fmt: skip
+
+# Index of each key in the bitmap, in keys. Multiply by LOGI_LED_BITMAP_BYTES_PER_KEY to get the offset in bytes.
+LOGI_LED_BITMAP_INDEX = {
+    key: row * LOGI_LED_BITMAP_WIDTH + column
+    for row, keys in enumerate(LOGI_LED_BITMAP_LAYOUT)
+    for column, key in enumerate(keys)
+    if key is not None
+}
+
 LOGI_LED_DURATION_INFINITE = 0
 
 LOGI_DEVICETYPE_MONOCHROME_ORD = 0
@@ -0,0 +1,178 @@
+"""
+.. note::
+    downmix.py : Drives per-key, zonal and monochrome devices from a single per-key frame.
+
+.. warning::
+    This module requires `numpy <https://pypi.org/project/numpy/>`_. You can install it by
+    ``pip install logiled[numpy]``.
+"""
+
+import numpy as np
+
+from .bitmap import column_zones, frame_to_bitmap, new_bitmap
+from .dll_definition import (
+    LOGI_DEVICETYPE_ALL,
+    LOGI_DEVICETYPE_MONOCHROME,
+    LOGI_DEVICETYPE_PERKEY_RGB,
+    LOGI_DEVICETYPE_RGB,
+    LOGI_LED_BITMAP_HEIGHT,
+    LOGI_LED_BITMAP_WIDTH,
+)
+from .logi_led import RangeError, check_type
+
+#: Weights of the red, green and blue channels in the luminance (Rec. 709)
+REC_709 = (0.2126, 0.7152, 0.0722)
+
+
+class Downmixer:
+    """
+    Sends one frame to every kind of device: the frame itself to per-key devices, the average color of each zone
+    to zonal RGB devices and the luminance of the whole frame to monochrome devices.
+
+    Zone colors and luminance are computed together with a single matrix product. Each device type is only sent
+    a value when it changed since the previous frame, selecting it with
+    :func:`set_target_device <logiled.logi_led.NotTested.set_target_device>` first.
+
+    .. code-block:: python
+
+        downmixer = Downmixer(NotTested())
+        while running:
+            downmixer.update(render())
+
+    :param led: A :class:`~logiled.logi_led.NotTested` instance used to send the colors.
+    :param zone_masks: A ``(zones, LOGI_LED_BITMAP_HEIGHT, LOGI_LED_BITMAP_WIDTH)`` array selecting the keys
+                       averaged into each zone. Masks can be boolean or hold weights. Defaults to 5 vertical zones,
+                       see :func:`~logiled.bitmap.column_zones`.
+    :param int first_zone: Id of the zone of the first mask.
+    :param tuple luminance: Weights of the red, green and blue channels in the luminance of monochrome devices.
+                            They can't be negative and their sum can't be greater than 1.
+
+    :raises RangeError: Raised if the masks shape is not correct, if a mask is empty or if the luminance weights
+                        are not correct
+    :raises TypeError: Raised if bad type is passed as parameter
+    """
+
+    def __init__(
+        self,
+        led,
+        zone_masks=None,
+        first_zone: int = 1,
+        luminance: tuple = REC_709,
+    ):
+        check_type(int, first_zone)
+        if zone_masks is None:
+            zone_masks = column_zones(5)
+        zone_masks = np.asarray(zone_masks, dtype=np.float32)
+        if zone_masks.ndim != 3 or zone_masks.shape[1:] != (
+            LOGI_LED_BITMAP_HEIGHT,
+            LOGI_LED_BITMAP_WIDTH,
+        ):
+            raise RangeError(
+                "Zone masks must be of shape "
+                f"(zones, {LOGI_LED_BITMAP_HEIGHT}, {LOGI_LED_BITMAP_WIDTH})"
+            )
+        weights = zone_masks.reshape(len(zone_masks), -1)
+        totals = weights.sum(axis=1, keepdims=True)
+        if not np.all(totals > 0):
+            raise RangeError("Zone masks can't be empty")
+        luminance = np.asarray(luminance, dtype=np.float32)
+        if (
+            luminance.shape != (3,)
+            or np.any(luminance < 0)
+            or luminance.sum() > 1 + 1e-6
+        ):
+            raise RangeError(
+                "Luminance must be 3 weights greater than or equal to 0 "
+                "whose sum isn't greater than 1"
+            )
+
+        self.led = led
+        self.first_zone = first_zone
+        zones = len(weights)
+        # The last row averages the whole frame, for monochrome devices.
+        self._weights = np.vstack(
+            (
+                weights / totals,
+                np.full((1, weights.shape[1]), 1 / weights.shape[1]),
+            )
+        ).astype(np.float32)
+        self._luminance = luminance
+        self._mixed = np.empty((zones + 1, 3), dtype=np.float32)
+        self._levels = np.empty((zones + 1, 3), dtype=np.intp)
+        self._sent_levels = np.full((zones + 1, 3), -1, dtype=np.intp)
+        self._changed = np.empty(zones + 1, dtype=bool)
+        self.bitmap = new_bitmap()
+        self._sent_bitmap = new_bitmap()
+        self._started = False
+
+    @property
+    def zone_colors(self):
+        """
+        Color of each zone in the last frame sent, as RGB percentages, or ``None`` until every zone was sent.
+        """
+        colors = self._sent_levels[:-1]
+        return None if np.any(colors < 0) else colors
+
+    def update(self, frame):
+        """
+        Downmixes a frame and sends what changed to each device type.
+
+        :param numpy.ndarray frame: A frame, see :mod:`logiled.bitmap`.
+
+        :return: Device types which were sent a new value, combined as a bit mask
+        :rtype: int
+
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        frame_to_bitmap(frame, out=self.bitmap)
+        np.dot(
+            self._weights,
+            np.reshape(frame, (-1, 3)).astype(np.float32, copy=False),
+            out=self._mixed,
+        )
+        mono = self._mixed[-1]
+        mono[:] = np.dot(mono, self._luminance)
+        np.multiply(self._mixed, 100 / 255, out=self._mixed)
+        np.rint(self._mixed, out=self._mixed)
+        np.copyto(self._levels, self._mixed, casting="unsafe")
+        np.any(self._levels != self._sent_levels, axis=1, out=self._changed)
+
+        sent = 0
+        try:
+            if not self._started or not np.array_equal(
+                self.bitmap, self._sent_bitmap
+            ):
+                sent |= LOGI_DEVICETYPE_PERKEY_RGB
+                self.led.set_target_device(LOGI_DEVICETYPE_PERKEY_RGB)
+                self.led.set_lighting_from_bitmap(self.bitmap)
+                np.copyto(self._sent_bitmap, self.bitmap)
+                self._started = True
+
+            zones = np.flatnonzero(self._changed[:-1])
+            if zones.size:
+                sent |= LOGI_DEVICETYPE_RGB
+                self.led.set_target_device(LOGI_DEVICETYPE_RGB)
+                for zone in zones.tolist():
+                    red, green, blue = self._levels[zone].tolist()
+                    self.led.set_lighting_for_target_zone(
+                        zone + self.first_zone, red, green, blue
+                    )
+                    self._sent_levels[zone] = self._levels[zone]
+
+            if self._changed[-1]:
+                sent |= LOGI_DEVICETYPE_MONOCHROME
+                level = int(self._levels[-1, 0])
+                self.led.set_target_device(LOGI_DEVICETYPE_MONOCHROME)
+                self.led.set_lighting(level, level, level)
+                self._sent_levels[-1] = self._levels[-1]
+        except BaseException:
+            if sent:
+                # Keeps the original error if the connection is lost too.
+                try:
+                    self.led.set_target_device(LOGI_DEVICETYPE_ALL)
+                except BaseException:
+                    pass
+            raise
+        if sent:
+            self.led.set_target_device(LOGI_DEVICETYPE_ALL)
+        return sent
@@ -0,0 +1,344 @@
+"""
+.. note::
+    effects.py : Software per-key flash and pulse effects.
+
+    Instead of starting one effect per key in the SDK, every effect is stored in columns of NumPy arrays and all of
+    them are evaluated at once on each frame, which is sent with a single bitmap write.
+
+.. warning::
+    This module requires `numpy <https://pypi.org/project/numpy/>`_. You can install it by
+    ``pip install logiled[numpy]``.
+"""
+
+import time
+
+import numpy as np
+
+from .bitmap import frame_to_bitmap, new_bitmap, new_frame
+from .dll_definition import LOGI_LED_BITMAP_INDEX
+from .logi_led import RangeError, check_type, check_value
+
+_FLASH = 0
+_PULSE = 1
+
+
+def key_index(key_name: int):
+    """
+    :param int key_name: The key to find.
+
+    :return: The index of the key in a flattened frame
+    :rtype: int
+
+    :raises RangeError: Raised if the key is not on the bitmap
+    :raises TypeError: Raised if bad type is passed as parameter
+    """
+    check_type(int, key_name)
+    try:
+        return LOGI_LED_BITMAP_INDEX[key_name]
+    except KeyError:
+        raise RangeError(f"Key {key_name:#x} is not on the bitmap") from None
+
+
+class KeyEffects:
+    """
+    Runs flash and pulse effects on any number of keys, with the same parameters as
+    :func:`NotTested.flash_single_key <logiled.logi_led.NotTested.flash_single_key>` and
+    :func:`NotTested.pulse_single_key <logiled.logi_led.NotTested.pulse_single_key>`.
+
+    Effects are drawn over :attr:`base`, the most recent effect on top when a key has several. Call :func:`render`
+    on every frame to send the result.
+
+    .. code-block:: python
+
+        effects = KeyEffects(NotTested())
+        for key in ability_keys:
+            effects.pulse_single_key(key, 100, 0, 0, 500, is_infinite=True)
+        while running:
+            effects.render()
+
+    :param led: A :class:`~logiled.logi_led.NotTested` instance used to send the bitmap.
+    :param int capacity: Number of effects memory is allocated for at first. It grows when needed.
+    :param clock: Function returning the current time in seconds.
+
+    :ivar numpy.ndarray base: Frame drawn under the effects, see :mod:`logiled.bitmap`. Call :func:`invalidate`
+                              after modifying it.
+    """
+
+    def __init__(self, led, capacity: int = 64, clock=time.perf_counter):
+        check_type(int, capacity)
+        check_value(1, float("inf"), capacity)
+        self.led = led
+        self.clock = clock
+        self.base = new_frame()
+        self.bitmap = new_bitmap()
+        self._frame = np.empty(self.base.shape, dtype=np.float32)
+        self._pixels = self._frame.reshape(-1, 3)
+        self._count = 0
+        self._dirty = True
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        count = self._count
+        columns = {
+            "_cells": np.intp,
+            "_kinds": np.uint8,
+            "_infinite": bool,
+            "_starts": np.float64,
+            "_periods": np.float64,
+            "_durations": np.float64,
+        }
+        for name, dtype in columns.items():
+            column = np.zeros(capacity, dtype=dtype)
+            if count:
+                column[:count] = getattr(self, name)[:count]
+            setattr(self, name, column)
+        for name in ("_colors_from", "_colors_to"):
+            column = np.zeros((capacity, 3), dtype=np.float32)
+            if count:
+                column[:count] = getattr(self, name)[:count]
+            setattr(self, name, column)
+
+    def _add(
+        self, cell, kind, infinite, period, duration, color_from, color_to
+    ):
+        if self._count == self._cells.size:
+            self._allocate(self._cells.size * 2)
+        slot = self._count
+        self._cells[slot] = cell
+        self._kinds[slot] = kind
+        self._infinite[slot] = infinite
+        self._starts[slot] = self.clock()
+        self._periods[slot] = period
+        self._durations[slot] = duration
+        self._colors_from[slot] = color_from
+        self._colors_to[slot] = color_to
+        self._count += 1
+
+    def _keep(self, mask):
+        """
+        Keeps the effects selected by a boolean mask over the active effects.
+        """
+        kept = int(np.count_nonzero(mask))
+        if kept == self._count:
+            return
+        for column in (
+            self._cells,
+            self._kinds,
+            self._infinite,
+            self._starts,
+            self._periods,
+            self._durations,
+            self._colors_from,
+            self._colors_to,
+        ):
+            column[:kept] = column[: self._count][mask]
+        self._count = kept
+        self._dirty = True
+
+    def __len__(self):
+        return self._count
+
+    def flash_single_key(
+        self,
+        key_name: int,
+        red_percentage: int,
+        green_percentage: int,
+        blue_percentage: int,
+        ms_duration: int,
+        ms_interval: int,
+    ):
+        """
+        Flashes the key passed as parameter, alternating between the given color and :attr:`base` every
+        ``ms_interval`` milliseconds, for a defined duration in milliseconds.
+
+        :param int key_name: The key to flash.
+        :param int red_percentage: Amount of red. **Range is 0 to 100**.
+        :param int green_percentage: Amount of green. **Range is 0 to 100**.
+        :param int blue_percentage: Amount of blue. **Range is 0 to 100**.
+        :param int ms_duration: Duration of effect in millisecond.
+        :param int ms_interval: Interval duration between each effect in millisecond.
+
+        :raises RangeError: Raised if color percentage range is not correct or if the key is not on the bitmap
+        :raises TypeError: Raised if bad type is passed as parameter
+
+        .. tip::
+            Specifying a **ms_duration** to 0 will cause the effect to be infinite until reset
+        """
+        check_type(
+            int,
+            red_percentage,
+            green_percentage,
+            blue_percentage,
+            ms_duration,
+            ms_interval,
+        )
+        check_value(0, 100, red_percentage, green_percentage, blue_percentage)
+        check_value(0, float("inf"), ms_duration)
+        check_value(1, float("inf"), ms_interval)
+        color = (red_percentage, green_percentage, blue_percentage)
+        self._add(
+            key_index(key_name),
+            _FLASH,
+            ms_duration == 0,
+            ms_interval * 2 / 1000,
+            ms_duration / 1000,
+            np.multiply(color, 2.55),
+            0,
+        )
+
+    def pulse_single_key(
+        self,
+        key_name: int,
+        red_percentage_start: int,
+        green_percentage_start: int,
+        blue_percentage_start: int,
+        ms_duration: int,
+        is_infinite: bool = False,
+        red_percentage_end: int = 0,
+        green_percentage_end: int = 0,
+        blue_percentage_end: int = 0,
+    ):
+        """
+        Pulses the key passed as parameter from the start color to the finish color and back, over ``ms_duration``
+        milliseconds.
+
+        :param int key_name: The key to pulse.
+        :param int red_percentage_start: Amount of red in the start color of the effect. **Range is 0 to 100**.
+        :param int green_percentage_start: Amount of green in the start color of the effect. **Range is 0 to 100**.
+        :param int blue_percentage_start: Amount of blue in the start color of the effect. **Range is 0 to 100**.
+        :param int ms_duration: Duration of a pulse in millisecond.
+        :param bool is_infinite: If set to True, it will loop infinitely until stopped with a called to
+                                :func:`stop_effects_on_key` or :func:`stop_effects`
+        :param int red_percentage_end: Amount of red in the finish color of the effect. **Range is 0 to 100**.
+        :param int green_percentage_end: Amount of green in the finish color of the effect. **Range is 0 to 100**.
+        :param int blue_percentage_end: Amount of blue in the finish color of the effect. **Range is 0 to 100**.
+
+        :raises RangeError: Raised if color percentage range is not correct or if the key is not on the bitmap
+        :raises TypeError: Raised if bad type is passed as parameter
+        """
+        check_type(
+            int,
+            red_percentage_start,
+            green_percentage_start,
+            blue_percentage_start,
+            ms_duration,
+            red_percentage_end,
+            green_percentage_end,
+            blue_percentage_end,
+        )
+        check_type(bool, is_infinite)
+        check_value(
+            0,
+            100,
+            red_percentage_start,
+            green_percentage_start,
+            blue_percentage_start,
+            red_percentage_end,
+            green_percentage_end,
+            blue_percentage_end,
+        )
+        check_value(1, float("inf"), ms_duration)
+        start = (
+            red_percentage_start,
+            green_percentage_start,
+            blue_percentage_start,
+        )
+        end = (red_percentage_end, green_percentage_end, blue_percentage_end)
+        self._add(
+            key_index(key_name),
+            _PULSE,
+            is_infinite,
+            ms_duration / 1000,
+            ms_duration / 1000,
+            np.multiply(start, 2.55),
+            np.multiply(end, 2.55),
+        )
+
+    def stop_effects_on_key(self, key_name: int):
+        """
+        Stops every effect on the key passed in as parameter.
+
+        :param int key_name: The key to stop the effects on
+
+        :raises RangeError: Raised if the key is not on the bitmap
+        :raises TypeError: Raised if bad type is passed as parameter
+        """
+        cell = key_index(key_name)
+        self._keep(self._cells[: self._count] != cell)
+
+    def stop_effects(self):
+        """
+        Stops every effect.
+        """
+        self._keep(np.zeros(self._count, dtype=bool))
+
+    def is_active(self, key_name: int):
+        """
+        :param int key_name: The key to check.
+
+        :return: True if an effect is running on the key
+        :rtype: bool
+
+        :raises RangeError: Raised if the key is not on the bitmap
+        :raises TypeError: Raised if bad type is passed as parameter
+        """
+        cell = key_index(key_name)
+        return bool(np.any(self._cells[: self._count] == cell))
+
+    def invalidate(self):
+        """
+        Forces the next :func:`render` to send a bitmap, e.g. after :attr:`base` was modified.
+        """
+        self._dirty = True
+
+    def render(self, now: float = None):
+        """
+        Evaluates every effect and sends the resulting bitmap. Finished effects are removed.
+
+        Nothing is sent if no effect is running and nothing changed since the last call.
+
+        :param float now: Time of the frame, in seconds. Defaults to the current time.
+
+        :return: True if a bitmap was sent
+        :rtype: bool
+
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        if now is None:
+            now = self.clock()
+        count = self._count
+        elapsed = now - self._starts[:count]
+        self._keep(
+            self._infinite[:count] | (elapsed < self._durations[:count])
+        )
+        if not self._count and not self._dirty:
+            return False
+
+        count = self._count
+        cells = self._cells[:count]
+        elapsed = now - self._starts[:count]
+        phase = np.mod(elapsed, self._periods[:count]) / self._periods[:count]
+        weight = np.where(
+            self._kinds[:count] == _FLASH,
+            phase >= 0.5,
+            1 - np.abs(2 * phase - 1),
+        )[:, None]
+
+        np.copyto(self._frame, self.base)
+        colors_to = np.where(
+            (self._kinds[:count] == _FLASH)[:, None],
+            self._pixels[cells],
+            self._colors_to[:count],
+        )
+        colors_from = self._colors_from[:count]
+        colors = colors_from + (colors_to - colors_from) * weight
+        # Numpy doesn't specify which of repeated indices is assigned last, so only the most recent effect of each
+        # key is written.
+        _, last = np.unique(cells[::-1], return_index=True)
+        rows = count - 1 - last
+        self._pixels[cells[rows]] = colors[rows]
+
+        frame_to_bitmap(self._frame, out=self.bitmap)
+        self.led.set_lighting_from_bitmap(self.bitmap)
+        self._dirty = False
+        return True
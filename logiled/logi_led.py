@@ -10,6 +10,8 @@ import ctypes
 import os
 from pathlib import Path
 
+from .dll_definition import LOGI_LED_BITMAP_SIZE
+
 
 class SDKNotFound(BaseException):
     """
@@ -75,18 +77,95 @@ def check_type(type_name, *values):
             raise TypeError(f"Value {value} must be a {type_name}")
 
 
+#: ctypes type of a bitmap, an array of ``LOGI_LED_BITMAP_SIZE`` unsigned bytes
+Bitmap = ctypes.c_ubyte * LOGI_LED_BITMAP_SIZE
+
+
+def bitmap_pointer(bitmap):
+    """
+    Returns a pointer to a bitmap that can be passed to the SDK, without copying it when possible.
+
+    :param bitmap: Object supporting the buffer protocol of ``LOGI_LED_BITMAP_SIZE`` bytes.
+
+    :raises RangeError: Raised if bitmap size is not correct
+    :raises TypeError: Raised if bad type is passed as parameter
+    """
+    if isinstance(bitmap, Bitmap):
+        return bitmap
+    try:
+        view = memoryview(bitmap)
+    except TypeError:
+        raise TypeError(
+            f"Value {bitmap!r} must support the buffer protocol"
+        ) from None
+    if view.nbytes != LOGI_LED_BITMAP_SIZE:
+        raise RangeError(
+            f"Bitmap must be {LOGI_LED_BITMAP_SIZE} bytes, not {view.nbytes}"
+        )
+    if isinstance(bitmap, bytes):
+        return ctypes.c_char_p(bitmap)
+    if not view.c_contiguous:
+        return Bitmap.from_buffer_copy(view.tobytes())
+    if view.readonly:
+        return Bitmap.from_buffer_copy(view)
+    return Bitmap.from_buffer(view)
+
+
+class BitmapBuffers:
+    """
+    A pair of preallocated bitmaps to render frames without allocating memory.
+
+    Render each frame into :attr:`back`, then call :func:`swap` and send the returned bitmap. The previous frame
+    can still be read while the next one is rendered, e.g. by a :class:`~logiled.threaded.ThreadedLed`.
+
+    .. code-block:: python
+
+        buffers = BitmapBuffers()
+        while running:
+            render(buffers.back)
+            logi_led.set_lighting_from_bitmap(buffers.swap())
+
+    .. tip::
+        With NumPy, ``numpy.frombuffer(buffers.back, dtype=numpy.uint8)`` gives an array sharing the memory of the
+        bitmap.
+
+    :ivar Bitmap front: Last bitmap returned by :func:`swap`.
+    :ivar Bitmap back: Bitmap to render the next frame into.
+    """
+
+    def __init__(self):
+        self.front = Bitmap()
+        self.back = Bitmap()
+
+    def swap(self):
+        """
+        Exchanges :attr:`front` and :attr:`back`.
+
+        :return: The new :attr:`front`, i.e. the frame just rendered
+        :rtype: Bitmap
+        """
+        self.front, self.back = self.back, self.front
+        return self.front
+
+
 class LogitechLed:
     """
     .. note::
         The following class is the main class of library
     """
 
-    def __init__(self):
-        if led_dll is None:
+    def __init__(self, dll=None):
+        """
+        :param dll: Backend to use instead of the loaded SDK DLL, e.g. a
+                    :class:`~logiled.simulated.SimulatedDLL`. Defaults to the DLL loaded by :func:`load_dll`.
+        """
+        if dll is None:
+            dll = led_dll
+        if dll is None:
             raise DLLNotLoad(
                 "You must load DLL before using the Logipy packages"
             )
-        self.led_dll = led_dll
+        self.led_dll = dll
 
     def shutdown(self):
         """
@@ -260,8 +339,8 @@ class NotTested(LogitechLed):
         A list of untested functions, which can be used but for which we are not sure of the correct operation.
     """
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, dll=None):
+        super().__init__(dll)
 
     def flash_single_key(
         self,
@@ -562,19 +641,26 @@ class NotTested(LogitechLed):
             blue_percentage,
         )
 
-    def set_lighting_from_bitmap(self, bitmap: bytes):
+    def set_lighting_from_bitmap(self, bitmap):
         """
         Sets the array of bytes passed as parameter as colors.
 
         .. warning::
             This function only affects per-key backlighting featured connected devices.
 
-        :param bytes bitmap: An unsigned char array containing the colors to assign to each key
+        :param bitmap: An unsigned char array containing the colors to assign to each key. Any object supporting
+                       the buffer protocol of ``LOGI_LED_BITMAP_SIZE`` bytes is accepted (bytes, bytearray,
+                       memoryview, NumPy array, array.array, :class:`Bitmap`...). Writable contiguous buffers are
+                       sent without copy.
+        :raises RangeError: Raised if bitmap size is not correct
         :raises TypeError: Raised if bad type is passed as parameter
+
+        .. tip::
+            Use :class:`BitmapBuffers` to render frames without allocating memory.
         """
-        check_type(bytes, bitmap)
-        bitmap = ctypes.c_char_p(bitmap)
-        execute(self.led_dll.LogiLedSetLightingFromBitmap, bitmap)
+        execute(
+            self.led_dll.LogiLedSetLightingFromBitmap, bitmap_pointer(bitmap)
+        )
 
     def set_target_device(self, target_device: int):
         """
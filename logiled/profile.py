@@ -0,0 +1,417 @@
+"""
+.. note::
+    profile.py : Declarative lighting profiles, compiled once into ready-to-send colors.
+
+    A profile gives colors to groups of keys, named as in ``dll_definition``, and to the zones of each device
+    type. It is written in TOML or JSON:
+
+    .. code-block:: toml
+
+        background = [0, 0, 20]
+
+        [groups.movement]
+        keys = ["W", "A", "S", "D"]
+        color = [100, 0, 0]
+
+        [groups.macros]
+        keys = ["G_1", "G_2", "G_LOGO"]
+        color = [0, 100, 0]
+
+        [zones.RGB]
+        1 = [100, 0, 0]
+        2 = [0, 0, 100]
+
+    Colors are RGB percentages. Zone tables are named ``MONOCHROME``, ``RGB``, ``PERKEY_RGB`` or ``ALL``, after the
+    ``LOGI_DEVICETYPE_*`` constants.
+
+.. warning::
+    Reading TOML profiles requires Python 3.11 or `tomli <https://pypi.org/project/tomli/>`_. You can install it by
+    ``pip install logiled[toml]``.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from . import dll_definition
+from .dll_definition import (
+    LOGI_DEVICETYPE_ALL,
+    LOGI_DEVICETYPE_MONOCHROME,
+    LOGI_DEVICETYPE_PERKEY_RGB,
+    LOGI_DEVICETYPE_RGB,
+    LOGI_LED_BITMAP_BYTES_PER_KEY,
+    LOGI_LED_BITMAP_INDEX,
+    LOGI_LED_BITMAP_SIZE,
+)
+from .logi_led import check_type, check_value
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# Changing how profiles are compiled must change this, to invalidate the cache.
+_CACHE_VERSION = b"3"
+
+
+class InvalidProfile(BaseException):
+    """
+    Raised if a profile is malformed or names an unknown key or device type
+    """
+
+    pass
+
+
+def _key(name):
+    if not isinstance(name, str) or not name.isupper():
+        raise InvalidProfile(f"Unknown key {name!r}")
+    value = getattr(dll_definition, name, None)
+    if not isinstance(value, int) or name.startswith(("LOGI_", "_")):
+        raise InvalidProfile(f"Unknown key {name!r}")
+    return value
+
+
+_DEVICE_TYPES = {
+    "MONOCHROME": LOGI_DEVICETYPE_MONOCHROME,
+    "RGB": LOGI_DEVICETYPE_RGB,
+    "PERKEY_RGB": LOGI_DEVICETYPE_PERKEY_RGB,
+    "ALL": LOGI_DEVICETYPE_ALL,
+}
+
+
+def _device_type(name):
+    try:
+        return _DEVICE_TYPES[name]
+    except KeyError:
+        raise InvalidProfile(f"Unknown device type {name!r}") from None
+
+
+def _table(value, name):
+    if not isinstance(value, dict):
+        raise InvalidProfile(f"{name} must be a table")
+    return value
+
+
+def _color(value):
+    if not isinstance(value, list) or len(value) != 3:
+        raise InvalidProfile(f"Color {value!r} must be a list of 3 numbers")
+    if any(isinstance(component, bool) for component in value):
+        raise TypeError(f"Color {value!r} can't hold booleans")
+    check_type(int, *value)
+    check_value(0, 100, *value)
+    return tuple(value)
+
+
+class CompiledProfile:
+    """
+    A profile ready to send.
+
+    :ivar tuple background: Color, as RGB percentages, of the keys and zones the profile doesn't name.
+    :ivar bytes bitmap: Bitmap with the colors of every key on it.
+    :ivar dict keys: Color, as RGB percentages, of every key of the bitmap and of the other keys of the profile.
+    :ivar dict zones: Color, as RGB percentages, of each zone, by device type then by zone.
+    """
+
+    def __init__(
+        self, background: tuple, bitmap: bytes, keys: dict, zones: dict
+    ):
+        self.background = background
+        self.bitmap = bitmap
+        self.keys = keys
+        self.zones = zones
+
+    def to_json(self):
+        """
+        :return: The compiled profile serialized in JSON, as stored in the cache
+        :rtype: str
+        """
+        return json.dumps(
+            {
+                "background": self.background,
+                "bitmap": self.bitmap.hex(),
+                "keys": [[key, *color] for key, color in self.keys.items()],
+                "zones": [
+                    [device_type, zone, *color]
+                    for device_type, zones in self.zones.items()
+                    for zone, color in zones.items()
+                ],
+            }
+        )
+
+    @classmethod
+    def from_json(cls, text: str):
+        """
+        :param str text: A compiled profile serialized by :func:`to_json`.
+
+        :return: The compiled profile
+        :rtype: CompiledProfile
+        """
+        data = json.loads(text)
+        zones = {}
+        for device_type, zone, *color in data["zones"]:
+            zones.setdefault(device_type, {})[zone] = tuple(color)
+        return cls(
+            tuple(data["background"]),
+            bytes.fromhex(data["bitmap"]),
+            {key: tuple(color) for key, *color in data["keys"]},
+            zones,
+        )
+
+
+def parse_profile(content: bytes, toml: bool = False):
+    """
+    :param bytes content: Content of the profile.
+    :param bool toml: True if the profile is in TOML, False if it is in JSON.
+
+    :return: The profile as a dictionary
+    :rtype: dict
+
+    :raises InvalidProfile: Raised if the profile is malformed
+    """
+    try:
+        if toml:
+            if tomllib is None:
+                raise ImportError(
+                    "Reading TOML profiles requires Python 3.11 or tomli"
+                )
+            return tomllib.loads(content.decode())
+        return json.loads(content)
+    except ValueError as error:
+        raise InvalidProfile(f"Malformed profile: {error}") from None
+
+
+def compile_profile(profile: dict):
+    """
+    Resolves the key names of a profile and renders its bitmap.
+
+    :param dict profile: The profile, see :func:`parse_profile`.
+
+    :return: The compiled profile
+    :rtype: CompiledProfile
+
+    :raises InvalidProfile: Raised if the profile is malformed or names an unknown key, zone or device type
+    :raises RangeError: Raised if color percentage range is not correct
+    :raises TypeError: Raised if bad type is passed as parameter
+    """
+    profile = _table(profile, "A profile")
+    background = _color(profile.get("background", [0, 0, 0]))
+    keys = dict.fromkeys(LOGI_LED_BITMAP_INDEX, background)
+    for name, group in _table(profile.get("groups", {}), "groups").items():
+        group = _table(group, f"Group {name!r}")
+        if "color" not in group or not isinstance(group.get("keys"), list):
+            raise InvalidProfile(
+                f"Group {name!r} needs a list of keys and a color"
+            )
+        color = _color(group["color"])
+        for key_name in group["keys"]:
+            keys[_key(key_name)] = color
+
+    zones = {}
+    for device_name, colors in _table(
+        profile.get("zones", {}), "zones"
+    ).items():
+        device_zones = zones.setdefault(_device_type(device_name), {})
+        for name, color in _table(colors, f"zones.{device_name}").items():
+            try:
+                zone = int(name)
+            except ValueError:
+                zone = -1
+            if not 0 <= zone <= 100:
+                raise InvalidProfile(
+                    f"Zone {name!r} must be a number from 0 to 100"
+                )
+            device_zones[zone] = _color(color)
+
+    bitmap = bytearray(LOGI_LED_BITMAP_SIZE)
+    for key, index in LOGI_LED_BITMAP_INDEX.items():
+        red, green, blue = (round(value * 2.55) for value in keys[key])
+        offset = index * LOGI_LED_BITMAP_BYTES_PER_KEY
+        bitmap[offset : offset + LOGI_LED_BITMAP_BYTES_PER_KEY] = bytes(
+            (blue, green, red, 255)
+        )
+    return CompiledProfile(background, bytes(bitmap), keys, zones)
+
+
+def load_profile(path, cache_dir=None):
+    """
+    Reads and compiles a profile. Files ending in ``.toml`` are read as TOML, others as JSON.
+
+    :param path: Path to the profile.
+    :param cache_dir: Directory where compiled profiles are kept, by hash of their content. If not given, the
+                      profile is compiled on every call.
+
+    :return: The compiled profile
+    :rtype: CompiledProfile
+
+    :raises InvalidProfile: Raised if the profile is malformed or names an unknown key or device type
+    :raises RangeError: Raised if color percentage range is not correct
+    """
+    path = Path(path)
+    content = path.read_bytes()
+    cache = None
+    if cache_dir is not None:
+        digest = hashlib.sha256(_CACHE_VERSION + content).hexdigest()
+        cache = Path(cache_dir) / f"{digest}.json"
+        try:
+            return CompiledProfile.from_json(cache.read_text())
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    compiled = compile_profile(
+        parse_profile(content, toml=path.suffix.lower() == ".toml")
+    )
+    if cache is not None:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        temporary = cache.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_text(compiled.to_json())
+        os.replace(temporary, cache)
+    return compiled
+
+
+class ProfileManager:
+    """
+    Sends compiled profiles, only sending what differs from the profile currently displayed.
+
+    :param led: A :class:`~logiled.logi_led.NotTested` instance used to send the colors.
+    :param int max_key_calls: Highest number of changed keys sent with per-key calls instead of a bitmap.
+
+    :ivar CompiledProfile current: The profile currently displayed.
+    """
+
+    def __init__(self, led, max_key_calls: int = 8):
+        check_type(int, max_key_calls)
+        check_value(0, float("inf"), max_key_calls)
+        self.led = led
+        self.max_key_calls = max_key_calls
+        self.current = None
+        self._keys = {}
+        self._zones = {}
+
+    def activate(self, profile: CompiledProfile):
+        """
+        Displays a profile. Switching between profiles costs a single bitmap write, plus one call per zone or key
+        outside the bitmap whose color changes. Keys and zones of the previous profiles that the new one doesn't
+        name are reset to its background color.
+
+        :param CompiledProfile profile: The profile to display.
+
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        keys = dict.fromkeys(self._keys, profile.background)
+        keys.update(profile.keys)
+        changed = [
+            key for key, color in keys.items() if self._keys.get(key) != color
+        ]
+        off_bitmap = [
+            key for key in changed if key not in LOGI_LED_BITMAP_INDEX
+        ]
+        on_bitmap = len(changed) - len(off_bitmap)
+        if on_bitmap > self.max_key_calls:
+            self.led.set_lighting_from_bitmap(profile.bitmap)
+            changed = off_bitmap
+        for key in changed:
+            self.led.set_lighting_for_key_with_key_name(key, *keys[key])
+        self._keys = keys
+
+        zones = {
+            device_type: dict.fromkeys(sent, profile.background)
+            for device_type, sent in self._zones.items()
+        }
+        for device_type, colors in profile.zones.items():
+            zones.setdefault(device_type, {}).update(colors)
+        for device_type, colors in zones.items():
+            sent = self._zones.get(device_type, {})
+            changed = {
+                zone: color
+                for zone, color in colors.items()
+                if sent.get(zone) != color
+            }
+            if changed:
+                self.led.set_target_device(device_type)
+                try:
+                    for zone, color in changed.items():
+                        self.led.set_lighting_for_target_zone(zone, *color)
+                except BaseException:
+                    # Keeps the original error if the connection is lost too.
+                    try:
+                        self.led.set_target_device(LOGI_DEVICETYPE_ALL)
+                    except BaseException:
+                        pass
+                    raise
+                self.led.set_target_device(LOGI_DEVICETYPE_ALL)
+            self._zones[device_type] = colors
+        self.current = profile
+
+
+class ProfileWatcher:
+    """
+    Reloads a profile file when it changes and sends the differences.
+
+    The modification time of the file is checked by polling, so it works on any file system.
+
+    .. code-block:: python
+
+        watcher = ProfileWatcher(ProfileManager(NotTested()), "game.toml", cache_dir=".cache")
+        while running:
+            watcher.poll()
+
+    :param ProfileManager manager: Manager used to send the profile.
+    :param path: Path to the profile.
+    :param cache_dir: See :func:`load_profile`.
+    :param float interval: Minimum time between two checks of the file, in seconds.
+    :param clock: Function returning the current time in seconds.
+    """
+
+    def __init__(
+        self,
+        manager,
+        path,
+        cache_dir=None,
+        interval: float = 1.0,
+        clock=time.monotonic,
+    ):
+        self.manager = manager
+        self.path = Path(path)
+        self.cache_dir = cache_dir
+        self.interval = interval
+        self.clock = clock
+        self._stamp = None
+        self._checked = None
+
+    def poll(self, force: bool = False):
+        """
+        Reloads and sends the profile if the file changed since the last call.
+
+        :param bool force: If True, checks the file even if ``interval`` has not elapsed.
+
+        :return: True if the profile was reloaded
+        :rtype: bool
+
+        :raises InvalidProfile: Raised if the profile is malformed or names an unknown key or device type
+        :raises RangeError: Raised if color percentage range is not correct
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        now = self.clock()
+        if (
+            not force
+            and self._checked is not None
+            and now - self._checked < self.interval
+        ):
+            return False
+        self._checked = now
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            # Editors may save by renaming a new file over the profile, the next poll will find it.
+            return False
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return False
+        self.manager.activate(load_profile(self.path, self.cache_dir))
+        self._stamp = stamp
+        return True
@@ -0,0 +1,271 @@
+"""
+.. note::
+    render.py : Offline pre-rendering of animations into playback files.
+
+    Effects too heavy to run in real time are rendered ahead of time, in parallel chunks over several processes,
+    into a file of bitmaps that is streamed to the keyboard afterwards.
+
+    An effect is a function taking the time of a frame in seconds and a :class:`numpy.random.Generator`, and
+    returning a frame (see :mod:`logiled.bitmap`). The generator of each frame is seeded from the seed of the
+    render and the index of the frame, so the result does not depend on how the frames are split between
+    processes. An effect must not keep state between frames.
+
+    .. code-block:: python
+
+        def sparkles(t, rng):
+            frame = numpy.zeros((6, 21, 3))
+            frame[rng.integers(6, size=10), rng.integers(21, size=10)] = 255 * (0.5 + 0.5 * math.sin(t))
+            return frame
+
+    .. code-block:: sh
+
+        $ python -m logiled render my_effects:sparkles sparkles.lgl --duration 60
+        $ python -m logiled play sparkles.lgl
+
+.. warning::
+    This module requires `numpy <https://pypi.org/project/numpy/>`_. You can install it by
+    ``pip install logiled[numpy]``.
+"""
+
+import importlib
+import math
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .bitmap import frame_to_bitmap, new_bitmap
+from .dll_definition import LOGI_LED_BITMAP_SIZE
+from .logi_led import BitmapBuffers, check_type, check_value
+
+_MAGIC = b"LGLD"
+_VERSION = 1
+# Magic, version, frames per second, number of frames.
+_HEADER = struct.Struct("<4sHHI")
+
+
+class InvalidPlayback(BaseException):
+    """
+    Raised if a file is not a playback file or is truncated
+    """
+
+    pass
+
+
+def load_effect(effect):
+    """
+    :param effect: An effect, or its import path as ``"module:function"``.
+
+    :return: The effect function
+
+    :raises ImportError: Raised if the module or the function can't be found
+    :raises TypeError: Raised if the effect is not a function or an import path
+    """
+    if callable(effect):
+        return effect
+    if not isinstance(effect, str):
+        raise TypeError(f"Effect {effect!r} must be a function")
+    module, _, name = effect.partition(":")
+    if not name:
+        raise TypeError(f"Effect {effect!r} must be given as module:function")
+    function = getattr(importlib.import_module(module), name, None)
+    if function is None:
+        raise ImportError(f"Module {module!r} has no effect {name!r}")
+    if not callable(function):
+        raise TypeError(f"Effect {effect!r} must be a function")
+    return function
+
+
+def render_frames(effect, start: int, stop: int, fps: int, seed: int):
+    """
+    Renders a range of frames of an effect.
+
+    :param effect: See :func:`load_effect`.
+    :param int start: Index of the first frame.
+    :param int stop: Index after the last frame.
+    :param int fps: Number of frames per second.
+    :param int seed: Seed of the render.
+
+    :return: The bitmaps of the frames, one after another
+    :rtype: bytes
+    """
+    effect = load_effect(effect)
+    bitmaps = np.empty((stop - start, LOGI_LED_BITMAP_SIZE), dtype=np.uint8)
+    bitmaps[:] = new_bitmap()
+    for row, index in enumerate(range(start, stop)):
+        rng = np.random.default_rng((seed, index))
+        frame = np.clip(effect(index / fps, rng), 0, 255)
+        frame_to_bitmap(frame, out=bitmaps[row])
+    return bitmaps.tobytes()
+
+
+def check_render(
+    effect,
+    duration: float,
+    fps: int = 30,
+    seed: int = 0,
+    workers: int = None,
+    chunk_frames: int = None,
+):
+    """
+    Checks the parameters of :func:`render` and loads the effect, without rendering anything. Takes the same
+    parameters as :func:`render`, except ``path``.
+
+    :return: The number of frames, the number of processes and the number of frames per chunk
+    :rtype: tuple
+
+    :raises ImportError: Raised if the effect can't be found
+    :raises RangeError: Raised if a parameter range is not correct
+    :raises TypeError: Raised if bad type is passed as parameter
+    """
+    check_type(int, fps, seed)
+    check_value(1, 65535, fps)
+    check_value(0, float("inf"), duration, seed)
+    load_effect(effect)
+    workers = workers or os.cpu_count() or 1
+    count = round(duration * fps)
+    if chunk_frames is None:
+        chunk_frames = max(1, math.ceil(count / (workers * 4)))
+    check_type(int, workers, chunk_frames)
+    check_value(1, float("inf"), workers, chunk_frames)
+    return count, workers, chunk_frames
+
+
+def render(
+    effect,
+    path,
+    duration: float,
+    fps: int = 30,
+    seed: int = 0,
+    workers: int = None,
+    chunk_frames: int = None,
+):
+    """
+    Renders an effect into a playback file, in parallel.
+
+    The timeline is split into chunks of frames rendered by a :class:`~concurrent.futures.ProcessPoolExecutor`.
+    Each chunk is written at its place in a temporary file as soon as it is done, and the file is moved to
+    ``path`` once every chunk was rendered. If rendering fails, ``path`` is left untouched.
+
+    :param effect: The effect, see :func:`load_effect`. Must be importable by the worker processes.
+    :param path: Path of the playback file to write.
+    :param float duration: Duration of the animation, in seconds.
+    :param int fps: Number of frames per second.
+    :param int seed: Seed of the render, 0 or greater.
+    :param int workers: Number of processes. Defaults to the number of processors.
+    :param int chunk_frames: Number of frames per chunk. By default, the timeline is split in 4 chunks per process.
+
+    :return: Number of frames rendered
+    :rtype: int
+
+    :raises ImportError: Raised if the effect can't be found
+    :raises RangeError: Raised if a parameter range is not correct
+    :raises TypeError: Raised if bad type is passed as parameter
+    """
+    count, workers, chunk_frames = check_render(
+        effect, duration, fps, seed, workers, chunk_frames
+    )
+
+    temporary = f"{os.fspath(path)}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, _VERSION, fps, count))
+            file.truncate(_HEADER.size + count * LOGI_LED_BITMAP_SIZE)
+            with ProcessPoolExecutor(workers) as pool:
+                chunks = {
+                    pool.submit(
+                        render_frames,
+                        effect,
+                        start,
+                        min(start + chunk_frames, count),
+                        fps,
+                        seed,
+                    ): start
+                    for start in range(0, count, chunk_frames)
+                }
+                try:
+                    for chunk in as_completed(chunks):
+                        # Dropping the future frees its bitmaps once written.
+                        start = chunks.pop(chunk)
+                        file.seek(_HEADER.size + start * LOGI_LED_BITMAP_SIZE)
+                        file.write(chunk.result())
+                finally:
+                    for chunk in chunks:
+                        chunk.cancel()
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+class Playback:
+    """
+    Reads a playback file one bitmap at a time.
+
+    :param path: Path of the playback file.
+
+    :ivar int fps: Number of frames per second.
+    :ivar int frames: Number of frames.
+
+    :raises InvalidPlayback: Raised if the file is not a playback file or is truncated
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            header = file.read(_HEADER.size)
+            size = os.fstat(file.fileno()).st_size
+        if len(header) != _HEADER.size:
+            raise InvalidPlayback(f"{path} is not a playback file")
+        magic, version, self.fps, self.frames = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise InvalidPlayback(f"{path} is not a playback file")
+        if size < _HEADER.size + self.frames * LOGI_LED_BITMAP_SIZE:
+            raise InvalidPlayback(f"{path} is truncated")
+
+    def __len__(self):
+        return self.frames
+
+    def __iter__(self):
+        """
+        Yields each frame, read into a pair of :class:`~logiled.logi_led.BitmapBuffers`. A bitmap is overwritten
+        two frames after it was yielded.
+        """
+        buffers = BitmapBuffers()
+        with open(self.path, "rb") as file:
+            file.seek(_HEADER.size)
+            for _ in range(self.frames):
+                file.readinto(buffers.back)
+                yield buffers.swap()
+
+    def play(self, led, loop: bool = False, realtime: bool = True):
+        """
+        Streams the frames to the keyboard.
+
+        :param led: A :class:`~logiled.logi_led.NotTested` instance used to send the bitmaps.
+        :param bool loop: If True, plays the animation again and again.
+        :param bool realtime: If True, frames are sent at ``fps`` frames per second. If False, they are sent as fast
+                              as they are read.
+
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        interval = 1 / self.fps
+        deadline = time.perf_counter()
+        while True:
+            for bitmap in self:
+                if realtime:
+                    deadline += interval
+                    delay = deadline - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        deadline = time.perf_counter()
+                led.set_lighting_from_bitmap(bitmap)
+            if not loop or not self.frames:
+                return
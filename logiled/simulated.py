@@ -0,0 +1,170 @@
+"""
+.. note::
+    simulated.py : An in-memory stand-in for the Logitech LED SDK DLL, so that lighting code can run and be tested
+    without Logitech G Hub or any device.
+"""
+
+import ctypes
+import time
+
+from .dll_definition import LOGI_DEVICETYPE_ALL, LOGI_LED_BITMAP_SIZE
+
+
+class SimulatedDLL:
+    """
+    Records every SDK call and keeps the resulting lighting state.
+
+    Pass an instance to :class:`~logiled.logi_led.LogitechLed` (or :class:`~logiled.logi_led.NotTested`) instead of
+    loading the real DLL:
+
+    .. code-block:: python
+
+        led = NotTested(SimulatedDLL())
+
+    :ivar dict calls: Number of calls made to each SDK function, by function name.
+    :ivar bytes bitmap: Last bitmap sent with ``LogiLedSetLightingFromBitmap``.
+    :ivar tuple lighting: Last color sent with ``LogiLedSetLighting``.
+    :ivar dict keys: Last color sent to each key, by key name.
+    :ivar dict zones: Last color sent to each ``(device_type, zone)``.
+    :ivar int target_device: Current target device type.
+    :ivar bool connected: Set to False to make every call fail, as if the connection with G Hub was lost.
+
+    :param latency: Time, in seconds, each call takes. Either a number or a function called with the name of the SDK
+                    function and returning a number, to simulate a variable latency.
+    :param sleep: Function used to wait for the latency, for instance :func:`SimulatedClock.sleep` to run faster
+                  than real time.
+    """
+
+    def __init__(self, latency=0, sleep=time.sleep):
+        self.latency = latency
+        self.sleep = sleep
+        self.calls = {}
+        self.bitmap = bytes(LOGI_LED_BITMAP_SIZE)
+        self.lighting = (0, 0, 0)
+        self.keys = {}
+        self.zones = {}
+        self.target_device = LOGI_DEVICETYPE_ALL
+        self.connected = True
+
+    def _call(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        latency = (
+            self.latency(name) if callable(self.latency) else self.latency
+        )
+        if latency > 0:
+            self.sleep(latency)
+        return int(self.connected)
+
+    def LogiLedInit(self):
+        return self._call("LogiLedInit")
+
+    def LogiLedShutdown(self):
+        return self._call("LogiLedShutdown")
+
+    def LogiLedSaveCurrentLighting(self):
+        return self._call("LogiLedSaveCurrentLighting")
+
+    def LogiLedRestoreLighting(self):
+        return self._call("LogiLedRestoreLighting")
+
+    def LogiLedSetTargetDevice(self, target_device):
+        self.target_device = target_device
+        return self._call("LogiLedSetTargetDevice")
+
+    def LogiLedSetLighting(self, red, green, blue):
+        self.lighting = (red, green, blue)
+        return self._call("LogiLedSetLighting")
+
+    def LogiLedFlashLighting(self, red, green, blue, ms_duration, ms_interval):
+        return self._call("LogiLedFlashLighting")
+
+    def LogiLedPulseLighting(self, red, green, blue, ms_duration, ms_interval):
+        return self._call("LogiLedPulseLighting")
+
+    def LogiLedStopEffects(self):
+        return self._call("LogiLedStopEffects")
+
+    def LogiLedSetLightingForTargetZone(
+        self, device_type, zone, red, green, blue
+    ):
+        self.zones[(self.target_device, zone)] = (red, green, blue)
+        return self._call("LogiLedSetLightingForTargetZone")
+
+    def LogiLedSetLightingFromBitmap(self, bitmap):
+        self.bitmap = ctypes.string_at(bitmap, LOGI_LED_BITMAP_SIZE)
+        return self._call("LogiLedSetLightingFromBitmap")
+
+    def LogiLedSetLightingForKeyWithKeyName(self, key_name, red, green, blue):
+        self.keys[key_name] = (red, green, blue)
+        return self._call("LogiLedSetLightingForKeyWithKeyName")
+
+    def LogiLedSetLightingForKeyWithHidCode(self, key_code, red, green, blue):
+        return self._call("LogiLedSetLightingForKeyWithHidCode")
+
+    def LogiLedSetLightingForKeyWithQuartzCode(
+        self, key_code, red, green, blue
+    ):
+        return self._call("LogiLedSetLightingForKeyWithQuartzCode")
+
+    def LogiLedSetLightingForKeyWithScanCode(self, key_code, red, green, blue):
+        return self._call("LogiLedSetLightingForKeyWithScanCode")
+
+    def LogiLedSaveLightingForKey(self, key_name):
+        return self._call("LogiLedSaveLightingForKey")
+
+    def LogiLedRestoreLightingForKey(self, key_name):
+        return self._call("LogiLedRestoreLightingForKey")
+
+    def LogiLedFlashSingleKey(
+        self, key_name, red, green, blue, ms_duration, ms_interval
+    ):
+        return self._call("LogiLedFlashSingleKey")
+
+    def LogiLedPulseSingleKey(
+        self,
+        key_name,
+        red_start,
+        green_start,
+        blue_start,
+        red_end,
+        green_end,
+        blue_end,
+        ms_duration,
+        is_infinite,
+    ):
+        return self._call("LogiLedPulseSingleKey")
+
+    def LogiLedStopEffectsOnKey(self, key_name):
+        return self._call("LogiLedStopEffectsOnKey")
+
+
+class SimulatedClock:
+    """
+    A virtual clock which only moves forward when :func:`sleep` is called.
+
+    .. code-block:: python
+
+        clock = SimulatedClock()
+        dll = SimulatedDLL(latency=0.01, sleep=clock.sleep)
+
+    :ivar float now: Current time, in seconds.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def time(self):
+        """
+        :return: The current time, in seconds
+        :rtype: float
+        """
+        return self.now
+
+    def sleep(self, seconds: float):
+        """
+        Moves the clock forward.
+
+        :param float seconds: Time to wait, in seconds.
+        """
+        if seconds > 0:
+            self.now += seconds
@@ -0,0 +1,194 @@
+"""
+.. note::
+    threaded.py : Thread-safe access to the SDK through a single writer thread.
+
+    The SDK and :class:`~logiled.logi_led.LogitechLed` are not thread-safe. Instead of sharing a lock, any thread
+    can enqueue commands, which one SDK thread runs in batches, in order.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Commands replacing the whole lighting of per-key devices, a pending one is useless if another one follows it.
+_FULL_FRAME = frozenset(("set_lighting_from_bitmap",))
+
+
+def _ignore_error(error):
+    logger.error(
+        "Lighting command failed", exc_info=(type(error), error, None)
+    )
+
+
+class ThreadedLed:
+    """
+    Facade running the methods of a :class:`~logiled.logi_led.LogitechLed` (or
+    :class:`~logiled.logi_led.NotTested`) instance on a dedicated thread.
+
+    Calling a method of the facade enqueues it and returns at once. Use :func:`submit` to get a
+    :class:`~concurrent.futures.Future` resolved with the result of the call, or with the error it raised, such as
+    :class:`~logiled.logi_led.RangeError` or :class:`~logiled.logi_led.ConnectionLost`.
+
+    .. code-block:: python
+
+        with ThreadedLed(NotTested()) as led:
+            led.set_lighting(100, 0, 0)
+            led.submit("set_lighting_for_key_with_key_name", W, 0, 100, 0).result()
+
+    .. note::
+        When several bitmaps are waiting in the queue one after another, only the last one is sent, unless a
+        future was requested for them.
+
+    .. warning::
+        Arguments are read when the command runs. Don't modify a buffer passed to
+        :func:`set_lighting_from_bitmap <logiled.logi_led.NotTested.set_lighting_from_bitmap>` until its future is
+        done, or pass a copy.
+
+    :param led: Instance whose methods are called by the SDK thread.
+    :param int max_batch: Maximum number of commands taken from the queue at once.
+    :param on_error: Function called on the SDK thread with the error raised by a command without future. By
+                     default, errors are logged.
+    """
+
+    def __init__(self, led, max_batch: int = 256, on_error=None):
+        self.led = led
+        self.max_batch = max_batch
+        self.on_error = on_error or _ignore_error
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="logiled-sdk", daemon=True
+        )
+        self._thread.start()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self.led, name)
+        if not callable(method):
+            return method
+
+        def post(*args, **kwargs):
+            self._put(method, args, kwargs, None)
+
+        post.__name__ = name
+        post.__doc__ = method.__doc__
+        return post
+
+    def _put(self, method, args, kwargs, future):
+        if self._closed:
+            raise RuntimeError("ThreadedLed is closed")
+        self._queue.put((method, args, kwargs, future))
+        # close() may have run meanwhile and queued the command behind the stop marker, where it is cancelled.
+        if self._closed and future is not None and future.cancel():
+            raise RuntimeError("ThreadedLed is closed")
+
+    def submit(self, name: str, /, *args, **kwargs):
+        """
+        Enqueues a method call.
+
+        :param str name: Name of the method to call, e.g. ``"set_lighting"``.
+        :param args: Positional arguments of the method.
+        :param kwargs: Keyword arguments of the method.
+
+        :return: A future resolved once the call ran
+        :rtype: concurrent.futures.Future
+
+        :raises AttributeError: Raised if the instance has no such method
+        """
+        future = Future()
+        self._put(getattr(self.led, name), args, kwargs, future)
+        return future
+
+    def flush(self, timeout: float = None):
+        """
+        Waits until every command enqueued before this call ran.
+
+        :param float timeout: Maximum time to wait, in seconds.
+
+        :raises TimeoutError: Raised if the commands didn't run in time
+        """
+        future = Future()
+        self._put(None, (), {}, future)
+        future.result(timeout)
+
+    def close(self, wait: bool = True):
+        """
+        Stops the SDK thread once the pending commands ran. No command can be enqueued afterwards.
+
+        :param bool wait: If True, waits for the thread to stop.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+        if wait:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        while True:
+            batch = [get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(get_nowait())
+            except queue.Empty:
+                pass
+
+            last = len(batch) - 1
+            for index, command in enumerate(batch):
+                if command is _STOP:
+                    self._cancel(batch[index + 1 :])
+                    return
+                method, args, kwargs, future = command
+                if (
+                    future is None
+                    and index < last
+                    and method.__name__ in _FULL_FRAME
+                    and batch[index + 1] is not _STOP
+                    and batch[index + 1][0] is not None
+                    and batch[index + 1][0].__name__ == method.__name__
+                ):
+                    continue
+                self._execute(method, args, kwargs, future)
+
+    def _cancel(self, commands):
+        """
+        Cancels the futures of commands left in the queue once the thread stops.
+        """
+        try:
+            while True:
+                commands.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        for command in commands:
+            if command is not _STOP and command[3] is not None:
+                command[3].cancel()
+
+    def _execute(self, method, args, kwargs, future):
+        if future is not None and not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = None if method is None else method(*args, **kwargs)
+        except BaseException as error:
+            if future is None:
+                try:
+                    self.on_error(error)
+                except Exception:
+                    logger.exception("Lighting error handler failed")
+            else:
+                future.set_exception(error)
+        else:
+            if future is not None:
+                future.set_result(result)
@@ -0,0 +1,347 @@
+"""
+.. note::
+    timers.py : Expiring key highlights scheduled on a hierarchical timer wheel.
+
+    Scheduling and cancelling a timer costs the same whatever the number of timers, and advancing the wheel only
+    touches the timers that expire, so thousands of highlights and cooldowns can live at once.
+
+.. warning::
+    This module requires `numpy <https://pypi.org/project/numpy/>`_. You can install it by
+    ``pip install logiled[numpy]``.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from .bitmap import frame_to_bitmap, new_bitmap, new_frame
+from .dll_definition import LOGI_LED_BITMAP_INDEX
+from .effects import key_index
+from .logi_led import RangeError, check_type, check_value
+
+
+class Timer:
+    """
+    Handle of a scheduled timer, returned by :func:`TimerWheel.schedule`.
+
+    :ivar payload: Object given when the timer was scheduled.
+    :ivar int deadline: Tick at which the timer expires.
+    """
+
+    __slots__ = ("payload", "deadline", "_slot")
+
+    def __init__(self, payload, deadline):
+        self.payload = payload
+        self.deadline = deadline
+        self._slot = None
+
+    @property
+    def active(self):
+        """
+        True until the timer expires or is cancelled.
+        """
+        return self._slot is not None
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel.
+
+    Level 0 has one slot per tick, each next level has slots ``slots`` times wider. A timer is put in the lowest
+    level its delay fits in, and moves down a level each time the slots above it are reached, so scheduling,
+    cancelling and expiring timers are O(1) amortized.
+
+    :param int slots: Number of slots per level.
+    :param int levels: Number of levels, at least 2. Delays longer than ``slots ** levels`` ticks are handled,
+                       they just move down through the top level more than once.
+    """
+
+    def __init__(self, slots: int = 64, levels: int = 4):
+        check_type(int, slots, levels)
+        check_value(2, float("inf"), slots, levels)
+        self.slots = slots
+        self.levels = levels
+        self.tick = 0
+        self._wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _place(self, timer):
+        delay = timer.deadline - self.tick
+        deadline = timer.deadline
+        span = self.slots
+        for level in range(self.levels):
+            if delay < span or level == self.levels - 1:
+                width = span // self.slots
+                if delay >= span:
+                    # Too far away, parked in the furthest slot of the top level.
+                    deadline = self.tick + span - width
+                slot = self._wheels[level][(deadline // width) % self.slots]
+                slot.add(timer)
+                timer._slot = slot
+                return
+            span *= self.slots
+
+    def schedule(self, deadline: int, payload=None):
+        """
+        Schedules a timer.
+
+        :param int deadline: Tick at which the timer expires. Past ticks expire on the next tick.
+        :param payload: Object returned by :func:`advance` when the timer expires.
+
+        :return: The handle of the timer
+        :rtype: Timer
+        """
+        timer = Timer(payload, max(deadline, self.tick + 1))
+        self._place(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer: Timer):
+        """
+        Cancels a timer. Does nothing if the timer already expired or was cancelled.
+
+        :param Timer timer: The timer to cancel.
+        """
+        if timer._slot is not None:
+            timer._slot.discard(timer)
+            timer._slot = None
+            self._count -= 1
+
+    def advance(self, tick: int):
+        """
+        Moves the wheel forward.
+
+        :param int tick: Tick to move to.
+
+        :return: The expired timers, by order of expiry
+        :rtype: list
+        """
+        expired = []
+        while self.tick < tick:
+            if not self._count:
+                self.tick = tick
+                break
+            self.tick += 1
+            width = 1
+            for level in range(1, self.levels):
+                width *= self.slots
+                if self.tick % width:
+                    break
+                slot = self._wheels[level][(self.tick // width) % self.slots]
+                timers = list(slot)
+                slot.clear()
+                for timer in timers:
+                    self._place(timer)
+            slot = self._wheels[0][self.tick % self.slots]
+            for timer in slot:
+                timer._slot = None
+                expired.append(timer)
+            self._count -= len(slot)
+            slot.clear()
+        return expired
+
+
+class HighlightScheduler:
+    """
+    Lights keys for a limited time, then restores their underlying color from :attr:`base`.
+
+    When several highlights are live on a key, the most recent one is shown. Call :func:`update` on every frame:
+    it expires the timers due and sends the keys that changed, with one per-key call each when there are few of
+    them, with a single bitmap otherwise.
+
+    .. code-block:: python
+
+        scheduler = HighlightScheduler(NotTested())
+        scheduler.highlight(Q, 100, 0, 0, 1500)
+        scheduler.cooldown([ONE, TWO, THREE, FOUR], 0, 0, 100, 8000)
+        while running:
+            scheduler.update()
+
+    :param led: A :class:`~logiled.logi_led.NotTested` instance used to send the colors.
+    :param float tick: Resolution of the timers, in seconds.
+    :param int max_key_calls: Highest number of changed keys sent with per-key calls instead of a bitmap.
+    :param clock: Function returning the current time in seconds.
+
+    :ivar numpy.ndarray base: Underlying colors of the keys, see :mod:`logiled.bitmap`. Call :func:`invalidate`
+                              after modifying it.
+    """
+
+    def __init__(
+        self,
+        led,
+        tick: float = 0.01,
+        max_key_calls: int = 8,
+        clock=time.perf_counter,
+    ):
+        check_type(int, max_key_calls)
+        check_value(0, float("inf"), max_key_calls)
+        if not tick > 0:
+            raise RangeError("tick must be greater than 0")
+        self.led = led
+        self.tick = tick
+        self.max_key_calls = max_key_calls
+        self.clock = clock
+        self.base = new_frame()
+        self.bitmap = new_bitmap()
+        self._frame = new_frame()
+        self._pixels = self._frame.reshape(-1, 3)
+        self._keys = {cell: key for key, cell in LOGI_LED_BITMAP_INDEX.items()}
+        self._wheel = TimerWheel()
+        self._wheel.tick = math.floor(clock() / tick)
+        self._live = {}
+        self._changed = set()
+        self._invalidated = True
+
+    def __len__(self):
+        return len(self._wheel)
+
+    def _to_tick(self, seconds):
+        return math.ceil(seconds / self.tick)
+
+    def _refresh(self, cell):
+        timers = self._live.get(cell)
+        if timers:
+            color = next(reversed(timers.values()))
+        else:
+            color = self.base.reshape(-1, 3)[cell]
+        self._pixels[cell] = color
+        self._changed.add(cell)
+
+    def highlight(
+        self,
+        key_name: int,
+        red_percentage: int,
+        green_percentage: int,
+        blue_percentage: int,
+        ms_duration: int,
+    ):
+        """
+        Lights a key for a defined duration.
+
+        :param int key_name: The key to light.
+        :param int red_percentage: Amount of red. **Range is 0 to 100**.
+        :param int green_percentage: Amount of green. **Range is 0 to 100**.
+        :param int blue_percentage: Amount of blue. **Range is 0 to 100**.
+        :param int ms_duration: Duration of the highlight in millisecond.
+
+        :return: The handle of the highlight, to pass to :func:`cancel`
+        :rtype: Timer
+
+        :raises RangeError: Raised if color percentage range is not correct or if the key is not on the bitmap
+        :raises TypeError: Raised if bad type is passed as parameter
+        """
+        check_type(
+            int, red_percentage, green_percentage, blue_percentage, ms_duration
+        )
+        check_value(0, 100, red_percentage, green_percentage, blue_percentage)
+        check_value(0, float("inf"), ms_duration)
+        cell = key_index(key_name)
+        timer = self._wheel.schedule(
+            self._to_tick(self.clock() + ms_duration / 1000), cell
+        )
+        color = np.multiply(
+            (red_percentage, green_percentage, blue_percentage), 2.55
+        ).round()
+        self._live.setdefault(cell, {})[timer] = color
+        self._refresh(cell)
+        return timer
+
+    def cooldown(
+        self,
+        key_names: list,
+        red_percentage: int,
+        green_percentage: int,
+        blue_percentage: int,
+        ms_duration: int,
+    ):
+        """
+        Displays a cooldown as a progress bar: all the keys are lit, then turn off one after another from the last
+        one, the first one turning off when the cooldown is over.
+
+        :param list key_names: The keys of the bar, in order.
+        :param int red_percentage: Amount of red. **Range is 0 to 100**.
+        :param int green_percentage: Amount of green. **Range is 0 to 100**.
+        :param int blue_percentage: Amount of blue. **Range is 0 to 100**.
+        :param int ms_duration: Duration of the cooldown in millisecond.
+
+        :return: The handles of the highlights of the keys
+        :rtype: list
+
+        :raises RangeError: Raised if color percentage range is not correct or if a key is not on the bitmap
+        :raises TypeError: Raised if bad type is passed as parameter
+        """
+        count = len(key_names)
+        return [
+            self.highlight(
+                key_name,
+                red_percentage,
+                green_percentage,
+                blue_percentage,
+                ms_duration * (count - index) // count,
+            )
+            for index, key_name in enumerate(key_names)
+        ]
+
+    def cancel(self, timer: Timer):
+        """
+        Removes a highlight before it expires. Does nothing if it already expired or was cancelled.
+
+        :param Timer timer: The handle returned by :func:`highlight`.
+        """
+        if timer.active:
+            self._wheel.cancel(timer)
+            self._expire(timer.payload, timer)
+
+    def _expire(self, cell, timer):
+        timers = self._live[cell]
+        del timers[timer]
+        if not timers:
+            del self._live[cell]
+        self._refresh(cell)
+
+    def invalidate(self):
+        """
+        Makes the next :func:`update` send every key, e.g. after :attr:`base` was modified.
+        """
+        self._invalidated = True
+
+    def update(self, now: float = None):
+        """
+        Expires the highlights due and sends the keys that changed.
+
+        :param float now: Current time, in seconds. Defaults to the current time.
+
+        :return: Number of keys sent, a bitmap write counting every key of the bitmap
+        :rtype: int
+
+        :raises ConnectionLost: Raised if connection with Logitech SDK is lost
+        """
+        if now is None:
+            now = self.clock()
+        for timer in self._wheel.advance(math.floor(now / self.tick)):
+            self._expire(timer.payload, timer)
+
+        if self._invalidated:
+            pixels = self._pixels
+            np.copyto(pixels, self.base.reshape(-1, 3))
+            for cell in self._live:
+                pixels[cell] = next(reversed(self._live[cell].values()))
+        elif len(self._changed) <= self.max_key_calls:
+            for cell in self._changed:
+                red, green, blue = (self._pixels[cell] / 2.55).round()
+                self.led.set_lighting_for_key_with_key_name(
+                    self._keys[cell], int(red), int(green), int(blue)
+                )
+            sent = len(self._changed)
+            self._changed.clear()
+            return sent
+
+        frame_to_bitmap(self._frame, out=self.bitmap)
+        self.led.set_lighting_from_bitmap(self.bitmap)
+        self._changed.clear()
+        self._invalidated = False
+        return len(LOGI_LED_BITMAP_INDEX)